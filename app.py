@@ -1,19 +1,55 @@
 import os
+import re
 import cv2
 import time
+import random
+import cProfile
 import logging
-import zipfile
+import mimetypes
+import unicodedata
+import threading
 import functools
 from io import BytesIO
-from multiprocessing.pool import ThreadPool as Pool
+from urllib.parse import quote
+from cache import LRUCache
+from datetime import datetime
+from pipeline import Pipeline, StageTimer, timed_source
+from sampling import FrameSampler, DEFAULT_SAMPLING_MODE
+from pagination import encode_cursor, decode_cursor, parse_page_size
+from jobs import JobManager
+from frame_writer import FrameWriter
+from frame_storage import (SegmentPacker, FRAME_STORAGE_LAYOUT, FRAME_STORAGE_LAYOUTS, SEGMENT_LAYOUT, LAZY_LAYOUT,
+                           get_video_os_filepath, get_frame_os_filepath, get_segment_number, resolve_frame_path,
+                           read_frame_bytes)
+from lazy_frames import lazy_frame_decoder
 from sqlalchemy.orm import sessionmaker
 from models import Video, FrameMetadata, Frame, engine
 from minio_config import minio_client, minio_bucket_name
-from flask import Flask, request, jsonify, abort, send_file
-from given_functions import is_frame_tagged, generate_metadata
+from zip_stream import prefetch, stream_stored_zip
+from object_stream import stream_object_range
+from metrics import registry, CallbackMetric, http_requests, http_request_seconds
+from flask import Flask, Response, request, jsonify, abort, send_file, make_response, g
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from given_functions import generate_metadata
+from threat_detection import threat_detector
 
 app = Flask(__name__)
 max_workers = 10
+encode_workers = 4
+detection_batch_size = 8
+# Every detection thread holds a batch and its shared memory copy, so their number is capped by this budget of frames
+# instead of growing with the number of detection processes (cores)
+detection_max_in_flight_frames = int(os.getenv('DETECTION_MAX_IN_FLIGHT_FRAMES', 64))
+read_cache_max_size = int(os.getenv('READ_CACHE_MAX_SIZE', 1000000))
+read_cache_ttl_seconds = int(os.getenv('READ_CACHE_TTL_SECONDS', 3600))
+ingest_queue_size = 32
+# A fraction of requests, and any request with an "X-Profile: 1" header when PROFILE_ON_HEADER is set, is profiled
+profile_sample_rate = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+profile_on_header = os.getenv('PROFILE_ON_HEADER', '0') == '1'
+profile_dir = os.getenv('PROFILE_DIR', 'profiles')
+# Only one profiler can be active in the interpreter at a time
+profiler_lock = threading.Lock()
 logging.basicConfig(level=logging.INFO)
 
 
@@ -27,186 +63,731 @@ class SingletonMeta(type):
         return cls._instances[cls]
 
 
+class IngestFrame:
+    __slots__ = ('frame_index', 'frame', 'is_threat', 'fov', 'azimuth', 'elevation', 'jpeg_bytes', 'OS_filepath',
+                 'segment_OS_filepath', 'segment_offset', 'segment_length', 'source_OS_filepath')
+
+    def __init__(self, frame_index, frame):
+        self.frame_index = frame_index
+        self.frame = frame
+        self.is_threat = None
+        self.fov = None
+        self.azimuth = None
+        self.elevation = None
+        self.jpeg_bytes = None
+        self.OS_filepath = None
+        self.segment_OS_filepath = None
+        self.segment_offset = None
+        self.segment_length = None
+        self.source_OS_filepath = None
+
+
+def _cached_value_size(value):
+    # Lists are weighted by their length, so a few huge frame lists can't crowd out everything else
+    return len(value) if isinstance(value, list) else 1
+
+
 class DBService(metaclass=SingletonMeta):
     Session = sessionmaker(bind=engine, expire_on_commit=False)
 
+    def __init__(self):
+        self.read_cache = LRUCache(max_size=read_cache_max_size, ttl_seconds=read_cache_ttl_seconds,
+                                   size_of=_cached_value_size)
+
+    def invalidate_video(self, video_id):
+        self.read_cache.invalidate('video_paths')
+        self.read_cache.invalidate_where(lambda key: isinstance(key, tuple) and key[1] == video_id)
+
+    def is_video_ingested(self, video_id):
+        video_instance = self.get_video_by_id(video_id)
+
+        return video_instance is not None and video_instance.frame_count is not None
+
     def update_video_frame_count(self, video_id, frame_count):
         with self.Session() as session:
             video_instance = session.query(Video).get(video_id)
             video_instance.frame_count = frame_count
+            video_instance.updated_at = datetime.utcnow()
+            session.commit()
+
+        self.invalidate_video(video_id)
+
+    def update_video_threat_count(self, video_id):
+        with self.Session() as session:
+            threat_frame_count = session.query(Frame).join(Frame.frame_metadata) \
+                .filter(Frame.video_id == video_id, FrameMetadata.is_threat).count()
+            video_instance = session.query(Video).get(video_id)
+            video_instance.threat_frame_count = threat_frame_count
+            video_instance.has_threat = threat_frame_count > 0
+            video_instance.updated_at = datetime.utcnow()
+            session.commit()
+
+        self.invalidate_video(video_id)
+
+        return threat_frame_count
+
+    def update_video_sampling(self, video_id, frame_sampler):
+        with self.Session() as session:
+            video_instance = session.query(Video).get(video_id)
+            video_instance.sampling_mode = frame_sampler.mode
+            video_instance.kept_frame_count = frame_sampler.kept_frame_count
+            video_instance.skipped_frame_count = frame_sampler.skipped_frame_count
+            video_instance.updated_at = datetime.utcnow()
             session.commit()
 
+        self.invalidate_video(video_id)
+
     def save_video(self, video_file_path, video_filename):
         with self.Session() as session:
             observation_post_name = video_filename.split("_")[0]
-            video_instance = Video(observation_post_name=observation_post_name)
+            video_instance = Video(observation_post_name=observation_post_name, updated_at=datetime.utcnow())
             session.add(video_instance)
             session.commit()
-            video_os_filepath = f'/videos/{video_instance.id}_{video_filename}'
+            video_os_filepath = get_video_os_filepath(video_instance.id, video_filename)
             minio_client.fput_object(minio_bucket_name, video_os_filepath, video_file_path)
             video_instance.OS_filepath = video_os_filepath
             session.commit()
 
+        self.invalidate_video(video_instance.id)
+
         return video_instance
 
-    def save_frame_metadata(self, frame, session):
-        is_threat = is_frame_tagged(frame)
-        fov, azimuth, elevation = generate_metadata(frame)
-        frame_metadata = FrameMetadata(is_threat=is_threat, fov=fov, azimuth=azimuth, elevation=elevation)
-        session.add(frame_metadata)
+    def detect_frames(self, ingest_frames):
+        threat_results = threat_detector.detect_batch([ingest_frame.frame for ingest_frame in ingest_frames])
+
+        for ingest_frame, is_threat in zip(ingest_frames, threat_results):
+            ingest_frame.is_threat = is_threat
+            ingest_frame.fov, ingest_frame.azimuth, ingest_frame.elevation = generate_metadata(ingest_frame.frame)
+
+        return ingest_frames
 
-        return frame_metadata
+    def encode_frame(self, ingest_frame):
+        _, jpeg_frame = cv2.imencode('.jpg', ingest_frame.frame)
+        ingest_frame.jpeg_bytes = jpeg_frame.tobytes()
+        # The raw frame is the largest thing in flight, drop it as soon as it is no longer needed
+        ingest_frame.frame = None
 
-    def save_frame(self, curr_frame_index, frame, video_id, video_name, session):
-        frame_metadata = self.save_frame_metadata(frame, session)
-        frame_os_filepath = f'/frames/{video_id}_{video_name}/frame_{curr_frame_index}.jpg'
-        _, jpeg_frame = cv2.imencode('.jpg', frame)
-        image_bytes = BytesIO(jpeg_frame)
+        return ingest_frame
+
+    def upload_frame(self, ingest_frame, video_id, video_name):
+        frame_os_filepath = get_frame_os_filepath(video_id, video_name, ingest_frame.frame_index)
         minio_client.put_object(minio_bucket_name, frame_os_filepath,
-                                image_bytes,
-                                len(jpeg_frame))
-        frame_db_instance = Frame(video_id=video_id, frame_metadata=frame_metadata,
-                                  OS_filepath=frame_os_filepath,
-                                  frame_index=curr_frame_index)
-        session.add(frame_db_instance)
+                                BytesIO(ingest_frame.jpeg_bytes),
+                                len(ingest_frame.jpeg_bytes))
+        ingest_frame.OS_filepath = frame_os_filepath
+        ingest_frame.jpeg_bytes = None
+
+        return ingest_frame
+
+    def reference_source_frame(self, ingest_frame, video_id, video_name):
+        # Lazily stored frames are decoded from the stored video when read, nothing is uploaded for them
+        ingest_frame.OS_filepath = get_frame_os_filepath(video_id, video_name, ingest_frame.frame_index)
+        ingest_frame.source_OS_filepath = get_video_os_filepath(video_id, video_name)
+        ingest_frame.frame = None
 
-        return frame_db_instance
+        return ingest_frame
 
-    def save_video_frames(self, video_frames, video_id, video_name):
+    def get_persisted_frame_indexes(self, video_id):
         with self.Session() as session:
-            with Pool(max_workers) as thread_pool:
-                save_frame_copier = functools.partial(self.save_frame, video_id=video_id, video_name=video_name,
-                                                      session=session)
-                thread_pool.starmap(save_frame_copier, enumerate(video_frames))
-            session.commit()
+            index_tuples = session.query(Frame.frame_index).filter(Frame.video_id == video_id).all()
 
-    def get_videos_os_filepaths(self):
+        return {index_tuple[0] for index_tuple in index_tuples}
+
+    def get_next_segment_number(self, video_id):
+        with self.Session() as session:
+            path_tuples = session.query(Frame.segment_OS_filepath).distinct() \
+                .filter(Frame.video_id == video_id, Frame.segment_OS_filepath.isnot(None)).all()
+
+        return max((get_segment_number(path_tuple[0]) for path_tuple in path_tuples), default=-1) + 1
+
+    def persist_frame(self, ingest_frame, frame_writer, progress):
+        frame_writer.add(ingest_frame)
+
+        if progress is not None:
+            progress.add_frames_processed()
+
+    def save_video_frames(self, video_frames, video_id, video_name, persisted_frame_indexes=frozenset(),
+                          progress=None, frame_storage_layout=FRAME_STORAGE_LAYOUT, frame_sampler=None,
+                          stage_timer=None):
+        # Progress is saved by the writer, on its connection, whenever it commits frames
+        frame_writer = FrameWriter(engine, video_id, before_commit=progress.save if progress is not None else None)
+        pipeline = Pipeline(queue_size=ingest_queue_size, stage_timer=stage_timer or StageTimer())
+        # Two feeding threads per detection process keep every process busy while the next batch is copied, as far as
+        # the in-flight budget allows
+        detection_threads = max(1, min(threat_detector.workers * 2,
+                                        detection_max_in_flight_frames // detection_batch_size))
+        pipeline.add_stage('detect', self.detect_frames, workers=detection_threads, batch_size=detection_batch_size)
+
+        if frame_storage_layout == LAZY_LAYOUT:
+            pipeline.add_stage('reference', functools.partial(self.reference_source_frame, video_id=video_id,
+                                                              video_name=video_name))
+        elif frame_storage_layout == SEGMENT_LAYOUT:
+            pipeline.add_stage('encode', self.encode_frame, workers=encode_workers)
+            segment_packer = SegmentPacker(video_id, video_name,
+                                           first_segment_number=self.get_next_segment_number(video_id))
+            pipeline.add_stage('upload', segment_packer.pack, workers=encode_workers, on_finish=segment_packer.flush,
+                               batch_size=detection_batch_size)
+        else:
+            pipeline.add_stage('encode', self.encode_frame, workers=encode_workers)
+            pipeline.add_stage('upload', functools.partial(self.upload_frame, video_id=video_id,
+                                                           video_name=video_name), workers=max_workers)
+
+        pipeline.add_stage('persist', functools.partial(self.persist_frame, frame_writer=frame_writer,
+                                                        progress=progress), on_finish=frame_writer.flush)
+        indexed_frames = enumerate(video_frames)
+
+        if frame_sampler is not None:
+            # A skipped frame is done once it is decoded, progress counts it like a persisted one so it can be compared
+            # with the decoded frame count
+            on_skip = (lambda _: progress.add_frames_processed()) if progress is not None else None
+            indexed_frames = frame_sampler.sample(indexed_frames, on_skip=on_skip)
+
+        # Frames committed by an earlier, interrupted ingest of the same video are skipped
+        ingest_frames = (IngestFrame(frame_index, frame) for frame_index, frame in indexed_frames
+                         if frame_index not in persisted_frame_indexes)
+
+        try:
+            pipeline.run(ingest_frames)
+        finally:
+            frame_writer.close()
+            self.invalidate_video(video_id)
+
+        return len(persisted_frame_indexes) + frame_writer.committed_frame_count
+
+    def _load_videos_os_filepaths(self):
         with self.Session() as session:
             paths_as_tuples = session.query(Video.OS_filepath).all()
             paths = [path_tuple[0] for path_tuple in paths_as_tuples]
 
         return paths
 
-    def get_video_by_id(self, video_id):
+    def get_videos_os_filepaths(self):
+        return self.read_cache.get_or_load('video_paths', self._load_videos_os_filepaths)
+
+    def _load_video_by_id(self, video_id):
         with self.Session() as session:
             video_instance = session.query(Video).get(video_id)
 
         return video_instance
 
-    def get_video_frame_at_index(self, video_id, frame_index):
+    def get_video_by_id(self, video_id):
+        # Missing videos are not cached, they may be created a moment later. Neither are videos that are still being
+        # ingested, only the process running the ingest would invalidate them when it finishes
+        return self.read_cache.get_or_load(('video', video_id), lambda: self._load_video_by_id(video_id),
+                                           should_cache=lambda video_instance: video_instance is not None
+                                           and video_instance.frame_count is not None)
+
+    def _load_video_frame_at_index(self, video_id, frame_index):
         with self.Session() as session:
             frame_instance = session.query(Frame).filter(Frame.video_id == video_id,
                                                          Frame.frame_index == frame_index).first()
+
+        if frame_instance is None:
+            frame_instance = self._load_sampled_frame_at_index(video_id, frame_index)
+
         return frame_instance
 
-    def get_video_frames(self, video_id):
+    def _load_sampled_frame_at_index(self, video_id, frame_index):
+        video_instance = self.get_video_by_id(video_id)
+
+        if video_instance is None or not video_instance.skipped_frame_count or video_instance.frame_count is None \
+                or not 0 <= frame_index < video_instance.frame_count:
+            return None
+
+        # A skipped frame resolves to the last frame kept before it, which it was a duplicate of
+        with self.Session() as session:
+            frame_instance = session.query(Frame).filter(Frame.video_id == video_id,
+                                                         Frame.frame_index <= frame_index) \
+                .order_by(Frame.frame_index.desc()).first()
+
+        return frame_instance
+
+    def get_video_frame_at_index(self, video_id, frame_index):
+        return self.read_cache.get_or_load(('frame', video_id, frame_index),
+                                           lambda: self._load_video_frame_at_index(video_id, frame_index),
+                                           should_cache=lambda frame_instance: frame_instance is not None)
+
+    def _load_video_frame_paths(self, video_id):
+        with self.Session() as session:
+            frame_rows = session.query(Frame.frame_index, Frame.OS_filepath, Frame.segment_OS_filepath,
+                                       Frame.source_OS_filepath) \
+                .filter(Frame.video_id == video_id).order_by(Frame.frame_index).all()
+
+        return [resolve_frame_path(video_id, frame_row) for frame_row in frame_rows]
+
+    def get_video_frame_paths(self, video_id):
+        # Frame lists of a video that is still being ingested keep growing, only finished videos are cached
+        return self.read_cache.get_or_load(('frame_paths', video_id), lambda: self._load_video_frame_paths(video_id),
+                                           should_cache=lambda _: self.is_video_ingested(video_id))
+
+    def _load_video_frames(self, video_id):
+        video_instance = self.get_video_by_id(video_id)
+
+        if video_instance is not None and video_instance.has_threat is False:
+            return []
+
         with self.Session() as session:
-            frames = session.query(Frame).filter(Frame.video_id == video_id,
-                                                 Frame.frame_metadata.has(FrameMetadata.is_threat)).all()
+            frames = session.query(Frame).join(Frame.frame_metadata) \
+                .filter(Frame.video_id == video_id, FrameMetadata.is_threat) \
+                .order_by(Frame.frame_index).all()
 
         return frames
 
+    def get_videos_page(self, after_video_id, limit):
+        with self.Session() as session:
+            query = session.query(Video)
 
-db_service = DBService()
+            if after_video_id is not None:
+                query = query.filter(Video.id > after_video_id)
 
+            videos = query.order_by(Video.id).limit(limit + 1).all()
 
-@app.post("/video")
-def upload_video_from_local_path():
-    start_time = time.perf_counter()
+        return videos[:limit], len(videos) > limit
 
-    video_file_path = request.json['path']
-    logging.info(f'Uploading video from local path: "{video_file_path}"')
-    video_name = os.path.basename(video_file_path)
-    video_instance = db_service.save_video(video_file_path, video_name)
-    video = cv2.VideoCapture(video_file_path)
-    video_frames = []
+    def get_video_frames_page(self, video_id, after_frame_index, limit, threat_only=False, start_index=None,
+                              end_index=None):
+        with self.Session() as session:
+            query = session.query(Frame.frame_index, Frame.OS_filepath, Frame.segment_OS_filepath,
+                                  Frame.source_OS_filepath, FrameMetadata.is_threat) \
+                .join(Frame.frame_metadata).filter(Frame.video_id == video_id)
 
+            if after_frame_index is not None:
+                query = query.filter(Frame.frame_index > after_frame_index)
+
+            if start_index is not None:
+                query = query.filter(Frame.frame_index >= start_index)
+
+            if end_index is not None:
+                query = query.filter(Frame.frame_index < end_index)
+
+            if threat_only:
+                query = query.filter(FrameMetadata.is_threat)
+
+            frame_rows = query.order_by(Frame.frame_index).limit(limit + 1).all()
+
+        return frame_rows[:limit], len(frame_rows) > limit
+
+    def get_video_frames(self, video_id):
+        return self.read_cache.get_or_load(('threat_frames', video_id), lambda: self._load_video_frames(video_id),
+                                           should_cache=lambda _: self.is_video_ingested(video_id))
+
+
+db_service = DBService()
+
+
+def iter_video_frames(video):
     while True:
         ret, frame = video.read()
 
-        if ret:
-            video_frames.append(frame)
-        else:
+        if not ret:
             break
 
-    db_service.save_video_frames(video_frames, video_instance.id, video_name)
-    video.release()
-    db_service.update_video_frame_count(video_instance.id, len(video_frames))
+        yield frame
+
+
+def run_ingest_job(progress):
+    start_time = time.perf_counter()
+
+    video_file_path = progress.video_file_path
+    logging.info(f'Uploading video from local path: "{video_file_path}"')
+    video_name = os.path.basename(video_file_path)
+    persisted_frame_indexes = frozenset()
+
+    if progress.video_id is None:
+        progress.set_stage('uploading_video')
+        video_instance = db_service.save_video(video_file_path, video_name)
+        progress.set_video_id(video_instance.id)
+    else:
+        persisted_frame_indexes = db_service.get_persisted_frame_indexes(progress.video_id)
+        progress.set_frames_processed(len(persisted_frame_indexes))
+        logging.info(f'Resuming video {progress.video_id} after {len(persisted_frame_indexes)} saved frames')
+
+    frame_sampler = FrameSampler(progress.sampling_mode or DEFAULT_SAMPLING_MODE, progress.sampling_parameter)
+    video = cv2.VideoCapture(video_file_path)
+
+    try:
+        progress.set_total_frames(int(video.get(cv2.CAP_PROP_FRAME_COUNT)) or None)
+        progress.set_stage('processing_frames')
+        video_frames = timed_source(iter_video_frames(video), progress.stage_timer, 'decode')
+        db_service.save_video_frames(video_frames, progress.video_id, video_name,
+                                     persisted_frame_indexes=persisted_frame_indexes, progress=progress,
+                                     frame_storage_layout=progress.frame_storage_layout or FRAME_STORAGE_LAYOUT,
+                                     frame_sampler=frame_sampler, stage_timer=progress.stage_timer)
+    finally:
+        video.release()
+
+    progress.set_stage('finalizing')
+    frame_count = frame_sampler.kept_frame_count + frame_sampler.skipped_frame_count
+    db_service.update_video_threat_count(progress.video_id)
+    db_service.update_video_sampling(progress.video_id, frame_sampler)
+    db_service.update_video_frame_count(progress.video_id, frame_count)
 
     end_time = time.perf_counter()
     elapsed_time = end_time - start_time
-    logging.info(f'Uploaded video in {elapsed_time:.2f} seconds. Saved {len(video_frames)} frames')
+    logging.info(f'Uploaded video in {elapsed_time:.2f} seconds. Saved {frame_sampler.kept_frame_count} of '
+                 f'{frame_count} frames')
+
+
+job_manager = JobManager(DBService.Session, run_ingest_job)
+# Jobs left unfinished by a previous run are resumed when a server process handles its first request, under any WSGI
+# server or the development server. With several server processes, enable it in one of them only.
+resume_jobs_on_startup = os.getenv('RESUME_JOBS_ON_STARTUP', '1') == '1'
+jobs_resumed = False
+jobs_resumed_lock = threading.Lock()
 
-    return 'Success'
+
+def resume_unfinished_jobs_once():
+    global jobs_resumed
+
+    with jobs_resumed_lock:
+        if jobs_resumed:
+            return
+
+        jobs_resumed = True
+
+    job_manager.resume_unfinished_jobs()
+
+
+registry.register(CallbackMetric('videodb_read_cache_events_total', 'Read cache lookups by result', 'counter',
+                                 lambda: {('hit',): db_service.read_cache.hits, ('miss',): db_service.read_cache.misses,
+                                          ('eviction',): db_service.read_cache.evictions}, ('result',)))
+registry.register(CallbackMetric('videodb_read_cache_size', 'Size of the read cache entries', 'gauge',
+                                 lambda: db_service.read_cache.stats()['size']))
+registry.register(CallbackMetric('videodb_lazy_frame_cache_events_total', 'Lazy frame cache lookups by result',
+                                 'counter', lambda: {('hit',): lazy_frame_decoder.frame_cache.hits,
+                                                     ('miss',): lazy_frame_decoder.frame_cache.misses,
+                                                     ('eviction',): lazy_frame_decoder.frame_cache.evictions},
+                                 ('result',)))
+registry.register(CallbackMetric('videodb_lazy_frame_cache_bytes', 'Size of the decoded frames in the lazy frame cache',
+                                 'gauge', lambda: lazy_frame_decoder.frame_cache.stats()['size']))
+registry.register(CallbackMetric('videodb_running_ingest_jobs', 'Ingest jobs currently running', 'gauge',
+                                 job_manager.get_running_job_count))
+registry.register(CallbackMetric('videodb_running_job_stage_seconds', 'Seconds spent per stage by running jobs',
+                                 'gauge', job_manager.get_live_stage_seconds, ('job_id', 'stage')))
+
+
+def should_profile_request():
+    if profile_on_header and request.headers.get('X-Profile') == '1':
+        return True
+
+    return profile_sample_rate > 0 and random.random() < profile_sample_rate
+
+
+@app.before_request
+def resume_unfinished_jobs_on_startup():
+    if resume_jobs_on_startup:
+        resume_unfinished_jobs_once()
+
+
+@app.before_request
+def start_request_instrumentation():
+    g.request_start_time = time.perf_counter()
+
+    if should_profile_request() and profiler_lock.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def get_request_endpoint():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def record_request(status):
+    endpoint = get_request_endpoint()
+    http_requests.inc(endpoint=endpoint, status=status)
+    http_request_seconds.observe(time.perf_counter() - g.request_start_time, endpoint=endpoint)
+    g.request_recorded = True
+
+
+def stop_request_profiler():
+    """
+    Stop the profiler of the current request, if it has one, and save its stats.
+
+    :return: The path of the saved stats, None if the request was not profiled.
+    """
+
+    profiler = g.pop('profiler', None)
+
+    if profiler is None:
+        return None
+
+    try:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        endpoint_name = re.sub(r'[^a-zA-Z0-9]+', '_', get_request_endpoint()).strip('_')
+        profile_path = os.path.join(profile_dir, f'{time.strftime("%Y%m%d-%H%M%S")}_{endpoint_name}_'
+                                                 f'{random.getrandbits(32):08x}.prof')
+        profiler.dump_stats(profile_path)
+
+        return profile_path
+    finally:
+        profiler_lock.release()
+
+
+@app.after_request
+def finish_request_instrumentation(response):
+    record_request(response.status_code)
+    profile_path = stop_request_profiler()
+
+    if profile_path is not None:
+        response.headers['X-Profile-File'] = profile_path
+
+    return response
+
+
+@app.teardown_request
+def teardown_request_instrumentation(error):
+    # When an unhandled exception propagates (e.g. in debug mode) after_request is skipped, but teardown always runs
+    if 'request_start_time' in g and not g.get('request_recorded'):
+        record_request(500)
+
+    stop_request_profiler()
+
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.post("/video")
+def upload_video_from_local_path():
+    video_file_path = request.json['path']
+    sampling_mode = request.json.get('sampling_mode')
+    sampling_parameter = request.json.get('sampling_parameter')
+    frame_storage_layout = request.json.get('frame_storage_layout')
+
+    if frame_storage_layout is not None and frame_storage_layout not in FRAME_STORAGE_LAYOUTS:
+        abort(400, f'Unknown frame storage layout "{frame_storage_layout}", expected one of '
+                   f'{", ".join(FRAME_STORAGE_LAYOUTS)}')
+
+    try:
+        # Fail fast on bad options instead of in the background job
+        frame_sampler = FrameSampler(sampling_mode or DEFAULT_SAMPLING_MODE, sampling_parameter)
+    except ValueError as error:
+        abort(400, str(error))
+
+    # The job keeps the parsed parameter, e.g. 5 for a "5" in the request
+    if sampling_parameter is not None:
+        sampling_parameter = frame_sampler.parameter
+
+    job_id = job_manager.submit(video_file_path, sampling_mode=sampling_mode, sampling_parameter=sampling_parameter,
+                                frame_storage_layout=frame_storage_layout)
+
+    return jsonify({'job_id': job_id}), 202
+
+
+@app.get("/jobs/<int:job_id>")
+def get_job_status(job_id):
+    job_status = job_manager.get_job_status(job_id)
+
+    if job_status is None:
+        abort(404)
+
+    return jsonify(job_status)
+
+
+def conditional_response(body, last_modified=None):
+    response = make_response(body)
+    response.add_etag()
+    response.last_modified = last_modified
+    # Clients may keep the response but must revalidate it, which costs them a 304 at most
+    response.cache_control.no_cache = True
+
+    return response.make_conditional(request)
 
 
 @app.get("/video/paths")
 def get_videos_os_filepaths():
-    return jsonify(db_service.get_videos_os_filepaths())
+    return conditional_response(jsonify(db_service.get_videos_os_filepaths()))
+
+
+def get_optional_int_arg(name):
+    value = request.args.get(name)
+
+    if value is None:
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        abort(400, f'"{name}" must be an integer')
+
+
+def get_page_args():
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        after_key = decode_cursor(request.args.get('cursor'))
+    except ValueError as error:
+        abort(400, str(error))
+
+    if after_key is not None and not isinstance(after_key, int):
+        abort(400, 'Invalid cursor')
+
+    return limit, after_key
 
 
-@app.get("/video/<video_id>/path")
+@app.get("/videos")
+def get_videos_page():
+    limit, after_video_id = get_page_args()
+    videos, has_more = db_service.get_videos_page(after_video_id, limit)
+    items = [{'id': video.id, 'observation_post_name': video.observation_post_name, 'path': video.OS_filepath,
+              'frame_count': video.frame_count, 'threat_frame_count': video.threat_frame_count} for video in videos]
+    next_cursor = encode_cursor(videos[-1].id) if has_more else None
+
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+@app.get("/video/<int:video_id>/frames")
+def get_video_frames_page(video_id):
+    if db_service.get_video_by_id(video_id) is None:
+        abort(404)
+
+    limit, after_frame_index = get_page_args()
+    threat_only = request.args.get('threat_only', '').lower() in ('1', 'true', 'yes')
+    frame_rows, has_more = db_service.get_video_frames_page(video_id, after_frame_index, limit,
+                                                            threat_only=threat_only,
+                                                            start_index=get_optional_int_arg('start_index'),
+                                                            end_index=get_optional_int_arg('end_index'))
+    items = [{'frame_index': frame_row.frame_index, 'path': resolve_frame_path(video_id, frame_row),
+              'is_threat': frame_row.is_threat} for frame_row in frame_rows]
+    next_cursor = encode_cursor(frame_rows[-1].frame_index) if has_more else None
+
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+
+@app.get("/video/<int:video_id>/path")
 def get_video_path_by_id(video_id):
     video_instance = db_service.get_video_by_id(video_id)
 
     if video_instance is None:
         abort(404)
 
-    return video_instance.OS_filepath
+    return conditional_response(video_instance.OS_filepath, video_instance.updated_at)
 
 
-@app.get("/video/<video_id>/frames/path")
+@app.get("/video/<int:video_id>/frames/path")
 def get_video_frame_paths(video_id):
     video_instance = db_service.get_video_by_id(video_id)
 
     if video_instance is None:
         abort(404)
 
-    return [frame.OS_filepath for frame in video_instance.frames]
+    return conditional_response(jsonify(db_service.get_video_frame_paths(video_id)), video_instance.updated_at)
 
 
-@app.get("/video/<video_id>/frames/<frame_index>/path")
+@app.get("/video/<int:video_id>/frames/<int:frame_index>/path")
 def get_video_frame_path_by_index(video_id, frame_index):
     frame_instance = db_service.get_video_frame_at_index(video_id, frame_index)
 
     if frame_instance is None:
         abort(404)
 
-    return frame_instance.OS_filepath
+    return conditional_response(resolve_frame_path(video_id, frame_instance))
+
 
+@app.get("/video/<int:video_id>/frames/<int:frame_index>/image")
+def get_video_frame_image(video_id, frame_index):
+    frame_instance = db_service.get_video_frame_at_index(video_id, frame_index)
 
-@app.get("/video/<video_id>/download")
+    if frame_instance is None:
+        abort(404)
+
+    frame_bytes = BytesIO(read_frame_bytes(frame_instance))
+
+    return send_file(frame_bytes, mimetype='image/jpeg', download_name=os.path.basename(frame_instance.OS_filepath))
+
+
+def set_attachment_file_name(response, file_name):
+    # Quoted as send_file does it, with an ASCII fallback and an RFC 5987 name for non ASCII file names
+    try:
+        file_name.encode('ascii')
+    except UnicodeEncodeError:
+        ascii_file_name = unicodedata.normalize('NFKD', file_name).encode('ascii', 'ignore').decode('ascii')
+        file_names = {'filename': ascii_file_name, 'filename*': f"UTF-8''{quote(file_name, safe='!#$&+-.^_`|~')}"}
+    else:
+        file_names = {'filename': file_name}
+
+    response.headers.set('Content-Disposition', 'attachment', **file_names)
+
+
+def get_requested_byte_range(size, etag):
+    """
+    :return: The (start, stop) of the single byte range the request asks for, None for the whole content.
+    :raise RequestedRangeNotSatisfiable: If the range lies outside of the content.
+    """
+
+    byte_range = request.range
+
+    # Several ranges would need a multipart response, sending everything is allowed instead
+    if byte_range is None or byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+
+    # With If-Range, the range only applies to the version of the content the client already has part of
+    if 'If-Range' in request.headers and request.if_range.etag != etag:
+        return None
+
+    bounds = byte_range.range_for_length(size)
+
+    if bounds is None:
+        raise RequestedRangeNotSatisfiable(length=size)
+
+    return bounds
+
+
+@app.get("/video/<int:video_id>/download")
 def download_video(video_id):
     video_instance = db_service.get_video_by_id(video_id)
 
     if video_instance is None:
         abort(404)
 
-    video_file = minio_client.get_object(minio_bucket_name, video_instance.OS_filepath)
+    video_stat = minio_client.stat_object(minio_bucket_name, video_instance.OS_filepath)
     video_name = os.path.basename(video_instance.OS_filepath)
+    response = Response(mimetype=mimetypes.guess_type(video_name)[0] or 'application/octet-stream')
+    set_attachment_file_name(response, video_name)
+    response.set_etag(video_stat.etag)
+    response.accept_ranges = 'bytes'
+
+    if request.if_none_match.contains_weak(video_stat.etag):
+        response.status_code = 304
+
+        return response
+
+    start, stop = 0, video_stat.size
+    byte_range = get_requested_byte_range(video_stat.size, video_stat.etag)
 
-    return send_file(video_file, download_name=video_name, as_attachment=True)
+    if byte_range is not None:
+        start, stop = byte_range
+        response.status_code = 206
+        response.content_range = ContentRange('bytes', start, stop, video_stat.size)
 
+    # Nothing is read from the object store before the body is sent, and only the requested bytes are
+    response.response = stream_object_range(video_instance.OS_filepath, start, stop)
+    response.content_length = stop - start
 
-@app.get("/video/<video_id>/download_threat_frames")
+    return response
+
+
+@app.get("/video/<int:video_id>/download_threat_frames")
 def download_threat_frames(video_id):
     frames = db_service.get_video_frames(video_id)
 
     if len(frames) == 0:
         abort(404)
 
-    threat_frames_zip = BytesIO()
-
-    with zipfile.ZipFile(threat_frames_zip, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for frame in frames:
-            frame_object = minio_client.get_object(minio_bucket_name, frame.OS_filepath)
-            zf.writestr(os.path.basename(frame.OS_filepath), frame_object.read())
-
-    threat_frames_zip.seek(0)
+    # Frames are already JPEG compressed, so they are stored as is and streamed while the next ones are fetched
+    frame_contents = prefetch(frames, read_frame_bytes)
+    zip_entries = ((os.path.basename(frame.OS_filepath), frame_bytes) for frame, frame_bytes in frame_contents)
     zip_file_name = "threat_frames.zip"
+    response = Response(stream_stored_zip(zip_entries), mimetype="application/zip")
+    set_attachment_file_name(response, zip_file_name)
 
-    return send_file(threat_frames_zip, mimetype="application/zip", download_name=zip_file_name, as_attachment=True)
+    return response
 
 
 if __name__ == '__main__':
+    # Resume right away instead of on the first request, but with the debug reloader only in the serving child process
+    if resume_jobs_on_startup and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resume_unfinished_jobs_once()
+
     app.run(threaded=True, debug=True)
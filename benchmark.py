@@ -0,0 +1,301 @@
+"""
+Offline ingest and read benchmark.
+
+Runs the service against SQLite and a local object store on a synthetic video, prints the results as JSON and
+compares them with the stored baseline, benchmark_baseline.json unless --baseline names another one. A baseline is
+recorded on the machine that runs the comparison:
+
+    python benchmark.py --frames 300 --width 1280 --height 720 --save-baseline
+    python benchmark.py --frames 300 --width 1280 --height 720 --output results.json
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import platform
+import resource
+import tempfile
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BASELINE_PATH = 'benchmark_baseline.json'
+DEFAULT_TOLERANCE = 0.2
+# Metrics compared against the baseline, with True where higher is better
+COMPARED_METRICS = {
+    'ingest_fps': True,
+    'detection_fps': True,
+    'detection_engine_fps': True,
+    'peak_rss_mb': False,
+    'read_latency_ms.video_path.p95': False,
+    'read_latency_ms.frame_path.p95': False,
+    'read_latency_ms.frame_paths.p95': False,
+    'read_latency_ms.frames_page.p95': False,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline ingest and read benchmark')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--threat-every', type=int, default=25, help='Embed the skull in every n-th frame, 0 for never')
+    parser.add_argument('--sampling-mode', default=None)
+    parser.add_argument('--frame-storage-layout', default=None, help='object, segment or lazy')
+    parser.add_argument('--object-store', choices=('memory', 'filesystem'), default='memory')
+    parser.add_argument('--read-requests', type=int, default=200, help='Requests per read endpoint')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results JSON to this path')
+    parser.add_argument('--baseline', help=f'Compare the results with this baseline JSON instead of '
+                                           f'{DEFAULT_BASELINE_PATH}')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative regression before the comparison fails')
+
+    return parser.parse_args(argv)
+
+
+def configure_environment(work_dir, object_store):
+    # Must run before the service modules are imported, they pick their database and object store on import
+    os.environ['DB_URI'] = f'sqlite:///{os.path.join(work_dir, "benchmark.db")}'
+    os.environ['OBJECT_STORE'] = object_store
+    os.environ['OBJECT_STORE_PATH'] = os.path.join(work_dir, 'objects')
+
+
+def generate_synthetic_video(video_path, width, height, frame_count, fps, threat_every, seed):
+    import cv2
+    import numpy as np
+    from PIL import Image
+    from given_functions import SKULL_IMAGE_BASE64
+
+    random_generator = np.random.default_rng(seed)
+    skull_image = np.array(Image.open(BytesIO(base64.b64decode(SKULL_IMAGE_BASE64))))
+    background = random_generator.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+    try:
+        for frame_index in range(frame_count):
+            frame = background.copy()
+            box_x = (frame_index * 7) % max(width - 80, 1)
+            cv2.rectangle(frame, (box_x, height // 3), (box_x + 80, height // 3 + 80), (0, 0, 255), -1)
+
+            if threat_every and frame_index % threat_every == 0 and \
+                    skull_image.shape[0] < height and skull_image.shape[1] < width:
+                frame[:skull_image.shape[0], :skull_image.shape[1]] = skull_image
+
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def read_video_frames(video_path, limit=None):
+    import cv2
+
+    video = cv2.VideoCapture(video_path)
+    frames = []
+
+    try:
+        while limit is None or len(frames) < limit:
+            ret, frame = video.read()
+
+            if not ret:
+                break
+
+            frames.append(frame)
+    finally:
+        video.release()
+
+    return frames
+
+
+def percentiles(samples):
+    ordered_samples = sorted(samples)
+
+    def percentile(fraction):
+        return ordered_samples[min(int(fraction * len(ordered_samples)), len(ordered_samples) - 1)]
+
+    return {'p50': percentile(0.5), 'p95': percentile(0.95), 'p99': percentile(0.99),
+            'mean': sum(ordered_samples) / len(ordered_samples)}
+
+
+def benchmark_detection(video_path):
+    from given_functions import is_frame_tagged
+    from threat_detection import threat_detector
+
+    frames = read_video_frames(video_path, limit=50)
+    start_time = time.perf_counter()
+
+    for frame in frames:
+        is_frame_tagged(frame)
+
+    detection_seconds = time.perf_counter() - start_time
+    # Warm the engine up first, process start-up is not part of its throughput
+    threat_detector.detect_batch(frames[:1])
+    batches = [frames[index:index + 8] for index in range(0, len(frames), 8)]
+    start_time = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=threat_detector.workers * 2) as executor:
+        list(executor.map(threat_detector.detect_batch, batches))
+
+    engine_seconds = time.perf_counter() - start_time
+
+    return {'detection_fps': len(frames) / detection_seconds, 'detection_engine_fps': len(frames) / engine_seconds,
+            'detection_workers': threat_detector.workers}
+
+
+def benchmark_ingest(app_module, video_path, sampling_mode, frame_storage_layout):
+    job_id = app_module.job_manager.submit(video_path, sampling_mode=sampling_mode,
+                                           frame_storage_layout=frame_storage_layout)
+    start_time = time.perf_counter()
+    app_module.job_manager.wait(job_id)
+    ingest_seconds = time.perf_counter() - start_time
+    job_status = app_module.job_manager.get_job_status(job_id)
+
+    if job_status['status'] != 'completed':
+        raise RuntimeError(f'Benchmark ingest failed: {job_status["error"]}')
+
+    return job_status['video_id'], {'ingest_seconds': ingest_seconds,
+                                    'ingest_fps': job_status['total_frames'] / ingest_seconds,
+                                    'ingested_frames': job_status['frames_processed'],
+                                    'stage_seconds': job_status['stage_seconds']}
+
+
+def benchmark_reads(app_module, video_id, frame_count, request_count, seed):
+    random_generator = random.Random(seed)
+    client = app_module.app.test_client()
+    app_module.db_service.read_cache.clear()
+    endpoints = {
+        'video_path': lambda: f'/video/{video_id}/path',
+        'frame_path': lambda: f'/video/{video_id}/frames/{random_generator.randrange(frame_count)}/path',
+        'frame_image': lambda: f'/video/{video_id}/frames/{random_generator.randrange(frame_count)}/image',
+        'frame_paths': lambda: f'/video/{video_id}/frames/path',
+        'frames_page': lambda: f'/video/{video_id}/frames?limit=100&start_index='
+                               f'{random_generator.randrange(frame_count)}',
+        'video_paths': lambda: '/video/paths',
+    }
+    latencies = {}
+
+    for endpoint_name, make_url in endpoints.items():
+        samples = []
+
+        for _ in range(request_count):
+            url = make_url()
+            start_time = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - start_time) * 1000)
+
+            if response.status_code != 200:
+                raise RuntimeError(f'Benchmark read of {url} failed with {response.status_code}')
+
+        latencies[endpoint_name] = percentiles(samples)
+
+    return {'read_latency_ms': latencies, 'read_cache': app_module.db_service.read_cache.stats()}
+
+
+def flatten_metrics(metrics, prefix=''):
+    flat_metrics = {}
+
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            flat_metrics.update(flatten_metrics(value, f'{prefix}{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat_metrics[f'{prefix}{name}'] = value
+
+    return flat_metrics
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compare the COMPARED_METRICS of results and baseline.
+
+    :return: A list of regression descriptions, empty if nothing regressed more than tolerance.
+    """
+
+    current_metrics = flatten_metrics(results['metrics'])
+    baseline_metrics = flatten_metrics(baseline['metrics'])
+    regressions = []
+
+    for metric_name, higher_is_better in COMPARED_METRICS.items():
+        current_value = current_metrics.get(metric_name)
+        baseline_value = baseline_metrics.get(metric_name)
+
+        if current_value is None or not baseline_value:
+            continue
+
+        change = (current_value - baseline_value) / baseline_value
+
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f'{metric_name}: {baseline_value:.3f} -> {current_value:.3f} ({change:+.1%})')
+
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix='videodb-benchmark-')
+    configure_environment(work_dir, args.object_store)
+
+    import app as app_module
+    from threat_detection import threat_detector
+
+    video_path = os.path.join(work_dir, 'benchmark_video.mp4')
+    generate_synthetic_video(video_path, args.width, args.height, args.frames, args.fps, args.threat_every, args.seed)
+
+    metrics = {}
+    metrics.update(benchmark_detection(video_path))
+    video_id, ingest_metrics = benchmark_ingest(app_module, video_path, args.sampling_mode,
+                                                args.frame_storage_layout)
+    metrics.update(ingest_metrics)
+    metrics.update(benchmark_reads(app_module, video_id, args.frames, args.read_requests, args.seed))
+    threat_detector.shutdown()
+    metrics['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    metrics['peak_detection_worker_rss_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    results = {
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'save_baseline', 'tolerance')},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpu_count': os.cpu_count()},
+        'metrics': metrics,
+    }
+    results_json = json.dumps(results, indent=2, sort_keys=True)
+    print(results_json)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(results_json)
+
+    baseline_path = args.baseline or DEFAULT_BASELINE_PATH
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as baseline_file:
+            baseline_file.write(results_json)
+
+        return 0
+
+    # A missing default baseline only skips the comparison, a baseline that was asked for must exist
+    if not args.baseline and not os.path.isfile(baseline_path):
+        print(f'No baseline at {baseline_path}, run with --save-baseline to record one', file=sys.stderr)
+
+        return 0
+
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline.get('config') != results['config']:
+        print('Warning: the baseline was recorded with a different configuration', file=sys.stderr)
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+
+    for regression in regressions:
+        print(f'Regression: {regression}', file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
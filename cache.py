@@ -0,0 +1,121 @@
+import time
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe LRU cache with a time to live per entry.
+
+    The size of an entry is given by size_of (1 per entry by default), entries are evicted from the least recently
+    used end once the total size exceeds max_size.
+    Every invalidation starts a new generation, a value loaded by get_or_load is only stored if no invalidation
+    happened while it was loading, since it may have been read before the change that was invalidated.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=300, size_of=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.size_of = size_of or (lambda value: 1)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+
+            if entry is not _MISSING and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = _MISSING
+
+            if entry is _MISSING:
+                self.misses += 1
+
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def _set(self, key, value, generation=None):
+        entry_size = self.size_of(value)
+
+        if entry_size > self.max_size:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, entry_size)
+            self._size += entry_size
+
+            while self._size > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key, load, should_cache=None):
+        """
+        Return the cached value of key, loading and caching it on a miss.
+
+        :param key: The cache key.
+        :param load: Called without arguments to load the value on a miss.
+        :param should_cache: Optional predicate on the loaded value, the value is only cached if it returns True.
+        :return: The value.
+        """
+
+        with self._lock:
+            generation = self._generation
+
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            value = load()
+
+            if should_cache is None or should_cache(value):
+                self._set(key, value, generation)
+
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_where(self, predicate):
+        with self._lock:
+            self._generation += 1
+
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'size': self._size, 'max_size': self.max_size, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+    def _remove(self, key):
+        _, _, entry_size = self._entries.pop(key)
+        self._size -= entry_size
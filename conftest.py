@@ -0,0 +1,38 @@
+import os
+import shutil
+import pytest
+import tempfile
+
+TEST_VIDEO_FRAMES = 466
+
+# The service picks its database and object store when it is imported, so they are set before tests.py imports it.
+# An in-memory SQLite database would be private to each connection, the ingest threads need a shared file.
+_test_dir = tempfile.mkdtemp(prefix='videodb-tests-')
+os.environ['DB_URI'] = f'sqlite:///{os.path.join(_test_dir, "tests.db")}'
+os.environ.setdefault('OBJECT_STORE', 'memory')
+
+
+@pytest.fixture(scope='session')
+def test_video_path():
+    """
+    The path of test_video.mp4, generated deterministically when it is not checked out next to the tests.
+    """
+
+    if os.path.isfile('test_video.mp4'):
+        return os.path.abspath('test_video.mp4')
+
+    from benchmark import generate_synthetic_video
+
+    video_path = os.path.join(_test_dir, 'test_video.mp4')
+    generate_synthetic_video(video_path, 320, 240, TEST_VIDEO_FRAMES, 25, threat_every=25, seed=0)
+
+    return video_path
+
+
+@pytest.fixture(scope='session', autouse=True)
+def stop_background_workers():
+    yield
+
+    from threat_detection import threat_detector
+    threat_detector.shutdown()
+    shutil.rmtree(_test_dir, ignore_errors=True)
@@ -0,0 +1,182 @@
+import os
+import re
+import logging
+import threading
+from io import BytesIO
+from lazy_frames import lazy_frame_decoder
+from minio_config import minio_client, minio_bucket_name
+
+OBJECT_LAYOUT = 'object'
+SEGMENT_LAYOUT = 'segment'
+# Only the source video and the frame rows are stored, frames are decoded from the video when they are read
+LAZY_LAYOUT = 'lazy'
+FRAME_STORAGE_LAYOUTS = (OBJECT_LAYOUT, SEGMENT_LAYOUT, LAZY_LAYOUT)
+FRAME_STORAGE_LAYOUT = os.getenv('FRAME_STORAGE_LAYOUT', OBJECT_LAYOUT)
+SEGMENT_MAX_FRAMES = int(os.getenv('SEGMENT_MAX_FRAMES', 256))
+SEGMENT_MAX_BYTES = int(os.getenv('SEGMENT_MAX_MB', 64)) * 1024 * 1024
+
+
+def get_video_os_filepath(video_id, video_name):
+    return f'/videos/{video_id}_{video_name}'
+
+
+def get_frame_os_filepath(video_id, video_name, frame_index):
+    return f'/frames/{video_id}_{video_name}/frame_{frame_index}.jpg'
+
+
+def get_segment_os_filepath(video_id, video_name, segment_number):
+    return f'/frames/{video_id}_{video_name}/segment_{segment_number}.bin'
+
+
+def get_segment_number(segment_os_filepath):
+    return int(re.search(r'segment_(\d+)\.bin$', segment_os_filepath).group(1))
+
+
+def get_frame_image_path(video_id, frame_index):
+    return f'/video/{video_id}/frames/{frame_index}/image'
+
+
+def resolve_frame_path(video_id, frame):
+    """
+    Resolve a frame row to a path clients can fetch it from.
+
+    :param frame: A Frame instance, or a row with its OS_filepath, segment_OS_filepath, source_OS_filepath and
+                  frame_index.
+    :return: The frame's object key if it is stored as an object of its own, otherwise the path of the service's image
+             endpoint, since its OS_filepath names no object.
+    """
+
+    if frame.segment_OS_filepath is not None or frame.source_OS_filepath is not None:
+        return get_frame_image_path(video_id, frame.frame_index)
+
+    return frame.OS_filepath
+
+
+def open_frame_object(frame):
+    """
+    Resolve a frame row to its stored JPEG, for frames saved with the object or segment layout.
+
+    :param frame: A Frame instance.
+    :return: The object-store response, the caller must close and release it.
+    """
+
+    if frame.segment_OS_filepath is not None:
+        return minio_client.get_object(minio_bucket_name, frame.segment_OS_filepath,
+                                       offset=frame.segment_offset, length=frame.segment_length)
+
+    return minio_client.get_object(minio_bucket_name, frame.OS_filepath)
+
+
+def read_frame_bytes(frame):
+    """
+    Read the JPEG of a frame row, whatever layout it was saved with.
+    """
+
+    if frame.source_OS_filepath is not None:
+        return lazy_frame_decoder.read_frame_bytes(frame.source_OS_filepath, frame.frame_index)
+
+    frame_object = open_frame_object(frame)
+
+    try:
+        return frame_object.read()
+    finally:
+        frame_object.close()
+        frame_object.release_conn()
+
+
+class _OpenSegment:
+    def __init__(self, segment_number):
+        self.segment_number = segment_number
+        self.data = BytesIO()
+        self.ingest_frames = []
+
+
+class SegmentPacker:
+    """
+    Appends encoded frames to segment objects of up to max_frames frames or max_bytes bytes.
+
+    Every packing thread fills its own segment, so segments are uploaded concurrently.
+    Frames are returned only after the segment holding them was uploaded, which keeps the database from
+    referencing bytes that are not stored yet.
+    A resumed ingest starts at first_segment_number, after every segment that committed frames reference, so it never
+    overwrites them.
+    """
+
+    def __init__(self, video_id, video_name, max_frames=SEGMENT_MAX_FRAMES, max_bytes=SEGMENT_MAX_BYTES,
+                 first_segment_number=0):
+        self.video_id = video_id
+        self.video_name = video_name
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self._open_segments = {}
+        self._next_segment_number = first_segment_number
+        self._lock = threading.Lock()
+
+    def pack(self, ingest_frames):
+        """
+        Append frames to the calling thread's segment.
+
+        :param ingest_frames: IngestFrame instances holding their JPEG bytes.
+        :return: The frames whose segment was uploaded by this call.
+        """
+
+        stored_frames = []
+
+        for ingest_frame in ingest_frames:
+            segment = self._get_thread_segment()
+            ingest_frame.OS_filepath = get_frame_os_filepath(self.video_id, self.video_name, ingest_frame.frame_index)
+            ingest_frame.segment_OS_filepath = get_segment_os_filepath(self.video_id, self.video_name,
+                                                                      segment.segment_number)
+            ingest_frame.segment_offset = segment.data.tell()
+            ingest_frame.segment_length = len(ingest_frame.jpeg_bytes)
+            segment.data.write(ingest_frame.jpeg_bytes)
+            ingest_frame.jpeg_bytes = None
+            segment.ingest_frames.append(ingest_frame)
+
+            if len(segment.ingest_frames) >= self.max_frames or segment.data.tell() >= self.max_bytes:
+                with self._lock:
+                    del self._open_segments[threading.get_ident()]
+
+                stored_frames.extend(self._upload(segment))
+
+        return stored_frames
+
+    def flush(self):
+        """
+        Upload every segment that is still open.
+
+        :return: The frames of the uploaded segments.
+        """
+
+        with self._lock:
+            open_segments = list(self._open_segments.values())
+            self._open_segments.clear()
+
+        stored_frames = []
+
+        for segment in open_segments:
+            stored_frames.extend(self._upload(segment))
+
+        return stored_frames
+
+    def _get_thread_segment(self):
+        thread_id = threading.get_ident()
+
+        with self._lock:
+            segment = self._open_segments.get(thread_id)
+
+            if segment is None:
+                segment = _OpenSegment(self._next_segment_number)
+                self._next_segment_number += 1
+                self._open_segments[thread_id] = segment
+
+        return segment
+
+    def _upload(self, segment):
+        segment_os_filepath = get_segment_os_filepath(self.video_id, self.video_name, segment.segment_number)
+        segment_size = segment.data.tell()
+        segment.data.seek(0)
+        minio_client.put_object(minio_bucket_name, segment_os_filepath, segment.data, segment_size)
+        logging.debug(f'Uploaded {segment_os_filepath} with {len(segment.ingest_frames)} frames')
+
+        return segment.ingest_frames
@@ -0,0 +1,173 @@
+import os
+import csv
+import logging
+import sqlalchemy as db
+from io import StringIO
+from metrics import db_commit_seconds
+from models import FrameMetadata, Frame
+
+FRAME_WRITE_BATCH_SIZE = int(os.getenv('FRAME_WRITE_BATCH_SIZE', 1000))
+# In batches, a resumed ingest redoes at most this many batches of frames
+FRAME_COMMIT_INTERVAL = int(os.getenv('FRAME_COMMIT_INTERVAL', 10))
+
+
+class FrameWriter:
+    """
+    Writes frames and their metadata with batched multi-row inserts on a single connection.
+
+    PostgreSQL batches are written with COPY, other databases with an executemany INSERT ... RETURNING.
+    A transaction is committed every commit_interval batches, so an interrupted ingest keeps every committed batch.
+    before_commit is called with the connection right before every commit, so whatever it writes (e.g. job progress)
+    commits with the frames. SQLite allows a single writer, a second connection would wait for the open transaction.
+    The writer is not thread-safe, it is meant to be owned by a single persisting thread.
+    """
+
+    def __init__(self, engine, video_id, batch_size=FRAME_WRITE_BATCH_SIZE, commit_interval=FRAME_COMMIT_INTERVAL,
+                 before_commit=None):
+        self.engine = engine
+        self.video_id = video_id
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.before_commit = before_commit
+        self.committed_frame_count = 0
+        self._pending_frames = []
+        self._uncommitted_batch_count = 0
+        self._uncommitted_frame_count = 0
+        self._connection = None
+        self._transaction = None
+        self._use_copy = False
+
+    def add(self, ingest_frame):
+        self._pending_frames.append(ingest_frame)
+
+        if len(self._pending_frames) >= self.batch_size:
+            self._write_batch()
+
+    def flush(self):
+        """
+        Write and commit everything that is still pending, then release the connection.
+        """
+
+        if self._pending_frames:
+            self._write_batch()
+
+        self._commit()
+        self.close()
+
+    def close(self):
+        """
+        Release the connection, rolling back anything that was not committed yet.
+        """
+
+        if self._transaction is not None:
+            self._transaction.rollback()
+            self._transaction = None
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _write_batch(self):
+        ingest_frames = self._pending_frames
+        self._pending_frames = []
+
+        if self._connection is None:
+            self._connection = self.engine.connect()
+            self._use_copy = self._supports_copy()
+
+        if self._transaction is None:
+            self._transaction = self._connection.begin()
+
+        try:
+            if self._use_copy:
+                self._copy_batch(ingest_frames)
+            else:
+                self._insert_batch(ingest_frames)
+        except Exception:
+            self.close()
+            raise
+
+        self._uncommitted_batch_count += 1
+        self._uncommitted_frame_count += len(ingest_frames)
+
+        if self._uncommitted_batch_count >= self.commit_interval:
+            self._commit()
+
+    def _commit(self):
+        if self._transaction is None:
+            return
+
+        if self.before_commit is not None:
+            try:
+                self.before_commit(self._connection)
+            except Exception:
+                self.close()
+                raise
+
+        with db_commit_seconds.time():
+            self._transaction.commit()
+
+        self._transaction = None
+        self.committed_frame_count += self._uncommitted_frame_count
+        logging.debug(f'Committed {self._uncommitted_frame_count} frames of video {self.video_id}')
+        self._uncommitted_batch_count = 0
+        self._uncommitted_frame_count = 0
+
+    def _supports_copy(self):
+        if self.engine.dialect.name != 'postgresql':
+            return False
+
+        cursor = self._connection.connection.cursor()
+
+        try:
+            # copy_expert is psycopg2 specific, other drivers fall back to executemany
+            return hasattr(cursor, 'copy_expert')
+        finally:
+            cursor.close()
+
+    def _frame_rows(self, ingest_frames, metadata_ids):
+        return [{'video_id': self.video_id, 'metadata_id': metadata_id, 'OS_filepath': ingest_frame.OS_filepath,
+                 'frame_index': ingest_frame.frame_index, 'segment_OS_filepath': ingest_frame.segment_OS_filepath,
+                 'segment_offset': ingest_frame.segment_offset, 'segment_length': ingest_frame.segment_length,
+                 'source_OS_filepath': ingest_frame.source_OS_filepath}
+                for ingest_frame, metadata_id in zip(ingest_frames, metadata_ids)]
+
+    def _insert_batch(self, ingest_frames):
+        metadata_rows = [{'is_threat': ingest_frame.is_threat, 'fov': ingest_frame.fov,
+                          'azimuth': ingest_frame.azimuth, 'elevation': ingest_frame.elevation}
+                         for ingest_frame in ingest_frames]
+        metadata_ids = self._connection.execute(
+            db.insert(FrameMetadata).returning(FrameMetadata.id, sort_by_parameter_order=True),
+            metadata_rows).scalars().all()
+        self._connection.execute(db.insert(Frame), self._frame_rows(ingest_frames, metadata_ids))
+
+    def _copy_batch(self, ingest_frames):
+        # COPY can't return the generated keys, so reserve the metadata ids from the sequence up front
+        metadata_ids = self._connection.execute(
+            db.text(f"SELECT nextval(pg_get_serial_sequence('{FrameMetadata.__tablename__}', 'id')) "
+                    f"FROM generate_series(1, :count)"),
+            {'count': len(ingest_frames)}).scalars().all()
+        metadata_rows = [(metadata_id, ingest_frame.is_threat, ingest_frame.fov, ingest_frame.azimuth,
+                          ingest_frame.elevation)
+                         for ingest_frame, metadata_id in zip(ingest_frames, metadata_ids)]
+        frame_column_names = ('video_id', 'metadata_id', 'OS_filepath', 'frame_index', 'segment_OS_filepath',
+                              'segment_offset', 'segment_length', 'source_OS_filepath')
+        frame_rows = [tuple(row[column_name] for column_name in frame_column_names)
+                      for row in self._frame_rows(ingest_frames, metadata_ids)]
+
+        cursor = self._connection.connection.cursor()
+
+        try:
+            self._copy_rows(cursor, FrameMetadata.__tablename__, ('id', 'is_threat', 'fov', 'azimuth', 'elevation'),
+                            metadata_rows)
+            self._copy_rows(cursor, Frame.__tablename__, frame_column_names, frame_rows)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _copy_rows(cursor, table_name, column_names, rows):
+        rows_csv = StringIO()
+        csv.writer(rows_csv).writerows(rows)
+        rows_csv.seek(0)
+        quoted_column_names = ', '.join(f'"{column_name}"' for column_name in column_names)
+        cursor.copy_expert(f'COPY {table_name} ({quoted_column_names}) FROM STDIN WITH (FORMAT csv)', rows_csv)
@@ -0,0 +1,251 @@
+import os
+import logging
+import threading
+import sqlalchemy as db
+from datetime import datetime
+from models import IngestJob
+from pipeline import StageTimer
+from concurrent.futures import ThreadPoolExecutor
+
+INGEST_JOB_CONCURRENCY = int(os.getenv('INGEST_JOB_CONCURRENCY', 2))
+PROGRESS_SAVE_INTERVAL_SECONDS = 2
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+UNFINISHED_JOB_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+
+class JobProgress:
+    """
+    Live progress of a running job, handed to the ingest function.
+
+    Progress is kept in memory, so reporting it from the hot path costs no database round-trip. It is written to the
+    jobs table by save, which the frame writer calls on its own connection whenever it commits, at most every
+    PROGRESS_SAVE_INTERVAL_SECONDS.
+    """
+
+    def __init__(self, job_manager, job):
+        self._job_manager = job_manager
+        self._lock = threading.Lock()
+        self._last_saved_at = None
+        self.job_id = job.id
+        self.video_file_path = job.video_file_path
+        self.sampling_mode = job.sampling_mode
+        self.sampling_parameter = job.sampling_parameter
+        self.frame_storage_layout = job.frame_storage_layout
+        self.video_id = job.video_id
+        self.stage = job.stage
+        self.total_frames = job.total_frames
+        self.frames_processed = job.frames_processed or 0
+        self.started_at = job.started_at
+        self.resumed_frames = self.frames_processed
+        self.stage_timer = StageTimer()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+        self._save(force=True)
+
+    def set_video_id(self, video_id):
+        with self._lock:
+            self.video_id = video_id
+
+        self._save(force=True)
+
+    def set_total_frames(self, total_frames):
+        with self._lock:
+            self.total_frames = total_frames
+
+    def set_frames_processed(self, frames_processed):
+        with self._lock:
+            self.resumed_frames = frames_processed
+            self.frames_processed = frames_processed
+
+    def add_frames_processed(self, frame_count=1):
+        with self._lock:
+            self.frames_processed += frame_count
+
+    def save(self, connection=None):
+        """
+        :param connection: Save within the transaction of this connection instead of on a new session.
+        """
+
+        self._save(connection=connection)
+
+    def _save(self, force=False, connection=None):
+        now = datetime.utcnow()
+
+        with self._lock:
+            if not force and self._last_saved_at is not None and \
+                    (now - self._last_saved_at).total_seconds() < PROGRESS_SAVE_INTERVAL_SECONDS:
+                return
+
+            self._last_saved_at = now
+            values = {'video_id': self.video_id, 'stage': self.stage, 'total_frames': self.total_frames,
+                      'frames_processed': self.frames_processed,
+                      'stage_seconds': dict(self.stage_timer.stage_seconds)}
+
+        self._job_manager.update_job(self.job_id, connection=connection, **values)
+
+
+class JobManager:
+    """
+    Runs ingest jobs on a bounded worker pool and keeps their state in the jobs table.
+
+    The pool size is the global budget of concurrently running ingests, further jobs wait in the queue.
+    Jobs that were queued or running when the server stopped are picked up again by resume_unfinished_jobs.
+    """
+
+    def __init__(self, Session, run_job, concurrency=INGEST_JOB_CONCURRENCY):
+        self.Session = Session
+        self.run_job = run_job
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ingest-job')
+        self._live_progress = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, video_file_path, sampling_mode=None, sampling_parameter=None, frame_storage_layout=None):
+        now = datetime.utcnow()
+
+        with self.Session() as session:
+            job = IngestJob(video_file_path=video_file_path, sampling_mode=sampling_mode,
+                            sampling_parameter=sampling_parameter, frame_storage_layout=frame_storage_layout,
+                            status=JOB_QUEUED, stage=JOB_QUEUED, frames_processed=0, created_at=now,
+                            updated_at=now)
+            session.add(job)
+            session.commit()
+
+        self._enqueue(job.id)
+
+        return job.id
+
+    def resume_unfinished_jobs(self):
+        with self.Session() as session:
+            job_ids = [job_id for job_id, in session.query(IngestJob.id)
+                       .filter(IngestJob.status.in_(UNFINISHED_JOB_STATUSES))
+                       .order_by(IngestJob.id)]
+
+        with self._lock:
+            # Jobs submitted since this process started are already in the queue
+            job_ids = [job_id for job_id in job_ids if job_id not in self._futures]
+
+        for job_id in job_ids:
+            logging.info(f'Resuming ingest job {job_id}')
+            self._enqueue(job_id)
+
+        return job_ids
+
+    def update_job(self, job_id, connection=None, **values):
+        values['updated_at'] = datetime.utcnow()
+
+        if connection is not None:
+            connection.execute(db.update(IngestJob).where(IngestJob.id == job_id).values(**values))
+
+            return
+
+        with self.Session() as session:
+            session.query(IngestJob).filter(IngestJob.id == job_id).update(values)
+            session.commit()
+
+    def get_job_status(self, job_id):
+        with self.Session() as session:
+            job = session.get(IngestJob, job_id)
+
+        if job is None:
+            return None
+
+        with self._lock:
+            progress = self._live_progress.get(job_id)
+
+        stage = job.stage
+        frames_processed = job.frames_processed or 0
+        total_frames = job.total_frames
+        resumed_frames = frames_processed
+        stage_seconds = job.stage_seconds
+
+        if progress is not None:
+            stage, frames_processed, total_frames = progress.stage, progress.frames_processed, progress.total_frames
+            resumed_frames = progress.resumed_frames
+            stage_seconds = dict(progress.stage_timer.stage_seconds)
+
+        fps = None
+        eta_seconds = None
+
+        if job.status == JOB_RUNNING and job.started_at is not None:
+            elapsed_seconds = (datetime.utcnow() - job.started_at).total_seconds()
+
+            if elapsed_seconds > 0:
+                fps = (frames_processed - resumed_frames) / elapsed_seconds
+
+            if fps and total_frames:
+                eta_seconds = max(total_frames - frames_processed, 0) / fps
+
+        return {'id': job.id, 'status': job.status, 'stage': stage, 'video_id': job.video_id,
+                'video_file_path': job.video_file_path, 'sampling_mode': job.sampling_mode,
+                'frame_storage_layout': job.frame_storage_layout, 'frames_processed': frames_processed,
+                'total_frames': total_frames, 'fps': fps, 'eta_seconds': eta_seconds, 'stage_seconds': stage_seconds,
+                'error': job.error}
+
+    def get_live_stage_seconds(self):
+        """
+        :return: The seconds spent per stage by every running job, keyed by (job id, stage).
+        """
+
+        with self._lock:
+            live_progress = list(self._live_progress.values())
+
+        return {(progress.job_id, stage_name): seconds for progress in live_progress
+                for stage_name, seconds in dict(progress.stage_timer.stage_seconds).items()}
+
+    def get_running_job_count(self):
+        with self._lock:
+            return len(self._live_progress)
+
+    def wait(self, job_id, timeout=None):
+        with self._lock:
+            future = self._futures.get(job_id)
+
+        if future is not None:
+            future.result(timeout)
+
+    def _enqueue(self, job_id):
+        future = self._executor.submit(self._run, job_id)
+
+        with self._lock:
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def _run(self, job_id):
+        with self.Session() as session:
+            job = session.get(IngestJob, job_id)
+
+        started_at = datetime.utcnow()
+        self.update_job(job_id, status=JOB_RUNNING, started_at=started_at, error=None)
+        job.started_at = started_at
+        progress = JobProgress(self, job)
+
+        with self._lock:
+            self._live_progress[job_id] = progress
+
+        try:
+            self.run_job(progress)
+        except Exception as error:
+            logging.exception(f'Ingest job {job_id} failed')
+            self.update_job(job_id, status=JOB_FAILED, stage=progress.stage, frames_processed=progress.frames_processed,
+                            stage_seconds=progress.stage_timer.stage_seconds, error=str(error))
+        else:
+            self.update_job(job_id, status=JOB_COMPLETED, stage=JOB_COMPLETED, video_id=progress.video_id,
+                            total_frames=progress.total_frames, frames_processed=progress.frames_processed,
+                            stage_seconds=progress.stage_timer.stage_seconds)
+        finally:
+            with self._lock:
+                self._live_progress.pop(job_id, None)
@@ -0,0 +1,239 @@
+import os
+import cv2
+import time
+import atexit
+import shutil
+import logging
+import tempfile
+import threading
+from cache import LRUCache
+from datetime import timedelta
+from collections import OrderedDict
+from minio_config import minio_client, minio_bucket_name
+
+LAZY_CACHE_DIR = os.getenv('LAZY_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'videodb-lazy-frames'))
+LAZY_OPEN_VIDEOS = int(os.getenv('LAZY_OPEN_VIDEOS', 4))
+LAZY_FRAME_CACHE_BYTES = int(os.getenv('LAZY_FRAME_CACHE_MB', 256)) * 1024 * 1024
+LAZY_FRAME_CACHE_TTL_SECONDS = int(os.getenv('LAZY_FRAME_CACHE_TTL_SECONDS', 3600))
+# Videos are only downloaded from object stores that can't hand out a URL, the downloads are capped at this many bytes
+LAZY_DOWNLOAD_MAX_BYTES = int(os.getenv('LAZY_DOWNLOAD_MAX_MB', 2048)) * 1024 * 1024
+LAZY_URL_EXPIRY_SECONDS = int(os.getenv('LAZY_URL_EXPIRY_SECONDS', 3600))
+# Reading this many frames forward from the current position is cheaper than seeking back to a keyframe
+LAZY_MAX_FORWARD_READ = int(os.getenv('LAZY_MAX_FORWARD_READ', 50))
+
+
+class _OpenVideo:
+    def __init__(self, video_os_filepath):
+        self.video_os_filepath = video_os_filepath
+        self.local_path = None
+        self.local_size = 0
+        self.capture = None
+        self.reopen_at = None
+        self.next_frame_index = 0
+        self.closed = False
+        self.lock = threading.Lock()
+
+
+class LazyFrameDecoder:
+    """
+    Materializes frames of lazily stored videos by decoding them from the stored source video on demand.
+
+    Videos are opened on a presigned URL, so FFmpeg reads only the byte ranges it needs to decode the requested frames.
+    Object stores without URLs (the in-memory one) have the video downloaded into cache_dir instead, the downloads of
+    open videos being capped at max_download_bytes.
+    The max_open_videos most recently read videos are kept open, so consecutive reads of a video continue decoding
+    from where the previous read stopped instead of seeking.
+    Decoded frames are kept as JPEG bytes in an LRU cache of up to frame_cache_bytes.
+    """
+
+    def __init__(self, cache_dir=LAZY_CACHE_DIR, max_open_videos=LAZY_OPEN_VIDEOS,
+                 frame_cache_bytes=LAZY_FRAME_CACHE_BYTES, max_forward_read=LAZY_MAX_FORWARD_READ,
+                 max_download_bytes=LAZY_DOWNLOAD_MAX_BYTES, url_expiry_seconds=LAZY_URL_EXPIRY_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_open_videos = max_open_videos
+        self.max_download_bytes = max_download_bytes
+        self.url_expiry_seconds = url_expiry_seconds
+        self.max_forward_read = max_forward_read
+        self.frame_cache = LRUCache(max_size=frame_cache_bytes, ttl_seconds=LAZY_FRAME_CACHE_TTL_SECONDS,
+                                    size_of=len)
+        self._open_videos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read_frame_bytes(self, video_os_filepath, frame_index):
+        """
+        :param video_os_filepath: Object-store path of the source video.
+        :param frame_index: Index of the frame in the video.
+        :return: The frame as JPEG bytes.
+        """
+
+        # Stored videos never change, so a decoded frame stays valid for as long as it is cached
+        return self.frame_cache.get_or_load((video_os_filepath, frame_index),
+                                            lambda: self._decode_frame(video_os_filepath, frame_index))
+
+    def close(self):
+        with self._lock:
+            open_videos = list(self._open_videos.values())
+            self._open_videos.clear()
+
+        for open_video in open_videos:
+            self._release(open_video)
+
+    def _decode_frame(self, video_os_filepath, frame_index):
+        while True:
+            open_video = self._get_open_video(video_os_filepath)
+
+            with open_video.lock:
+                # The video may have been evicted while waiting for its lock, then it is opened again
+                if open_video.closed:
+                    continue
+
+                # Reads of an open capture go on using its URL, so it is reopened before the URL expires
+                if open_video.reopen_at is not None and time.monotonic() >= open_video.reopen_at:
+                    self._close_capture(open_video)
+
+                if open_video.capture is None:
+                    self._open(open_video)
+
+                frame = self._read_frame(open_video, frame_index)
+
+            break
+
+        # Evicting takes the locks of other videos, so it must not run while holding this one's
+        self._evict_downloads(keep=open_video)
+
+        if frame is None:
+            raise IndexError(f'Frame {frame_index} of {video_os_filepath} could not be decoded')
+
+        _, jpeg_frame = cv2.imencode('.jpg', frame)
+
+        return jpeg_frame.tobytes()
+
+    def _get_open_video(self, video_os_filepath):
+        evicted_videos = []
+
+        with self._lock:
+            open_video = self._open_videos.get(video_os_filepath)
+
+            if open_video is None:
+                open_video = self._open_videos[video_os_filepath] = _OpenVideo(video_os_filepath)
+
+                while len(self._open_videos) > self.max_open_videos:
+                    evicted_videos.append(self._open_videos.popitem(last=False)[1])
+            else:
+                self._open_videos.move_to_end(video_os_filepath)
+
+        for evicted_video in evicted_videos:
+            self._release(evicted_video)
+
+        return open_video
+
+    def _open(self, open_video):
+        video_url = self._get_video_url(open_video.video_os_filepath)
+
+        if video_url is not None:
+            open_video.reopen_at = time.monotonic() + self.url_expiry_seconds * 0.9
+        else:
+            if open_video.local_path is None:
+                self._download(open_video)
+
+            video_url = open_video.local_path
+
+        open_video.capture = cv2.VideoCapture(video_url)
+        open_video.next_frame_index = 0
+
+        if not open_video.capture.isOpened():
+            self._close_capture(open_video)
+
+            raise IOError(f'Could not open {open_video.video_os_filepath} for lazy frame decoding')
+
+    def _get_video_url(self, video_os_filepath):
+        presigned_get_object = getattr(minio_client, 'presigned_get_object', None)
+
+        if presigned_get_object is None:
+            return None
+
+        return presigned_get_object(minio_bucket_name, video_os_filepath,
+                                    expires=timedelta(seconds=self.url_expiry_seconds))
+
+    def _download(self, open_video):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        file_descriptor, local_path = tempfile.mkstemp(dir=self.cache_dir,
+                                                       suffix=os.path.splitext(open_video.video_os_filepath)[1])
+        video_object = minio_client.get_object(minio_bucket_name, open_video.video_os_filepath)
+
+        try:
+            with os.fdopen(file_descriptor, 'wb') as local_file:
+                shutil.copyfileobj(video_object, local_file)
+        except Exception:
+            os.remove(local_path)
+            raise
+        finally:
+            video_object.close()
+            video_object.release_conn()
+
+        logging.debug(f'Downloaded {open_video.video_os_filepath} for lazy frame decoding')
+        open_video.local_path = local_path
+        open_video.local_size = os.path.getsize(local_path)
+
+    def _evict_downloads(self, keep):
+        evicted_videos = []
+
+        with self._lock:
+            download_bytes = sum(open_video.local_size for open_video in self._open_videos.values())
+
+            # Least recently read first, the video that was just downloaded stays even if it alone exceeds the cap
+            for video_os_filepath, open_video in list(self._open_videos.items()):
+                if download_bytes <= self.max_download_bytes:
+                    break
+
+                if open_video is not keep and open_video.local_size:
+                    del self._open_videos[video_os_filepath]
+                    evicted_videos.append(open_video)
+                    download_bytes -= open_video.local_size
+
+        for evicted_video in evicted_videos:
+            self._release(evicted_video)
+
+    def _read_frame(self, open_video, frame_index):
+        capture = open_video.capture
+        frames_to_skip = frame_index - open_video.next_frame_index
+
+        if not 0 <= frames_to_skip <= self.max_forward_read:
+            # Seeking lands on the keyframe before frame_index and decodes forward from there
+            capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            frames_to_skip = 0
+
+        for _ in range(frames_to_skip):
+            if not capture.grab():
+                open_video.next_frame_index = -1
+
+                return None
+
+        ret, frame = capture.read()
+        # An unknown position forces a seek on the next read
+        open_video.next_frame_index = frame_index + 1 if ret else -1
+
+        return frame if ret else None
+
+    @staticmethod
+    def _close_capture(open_video):
+        if open_video.capture is not None:
+            open_video.capture.release()
+            open_video.capture = None
+
+        open_video.reopen_at = None
+
+    def _release(self, open_video):
+        with open_video.lock:
+            open_video.closed = True
+            self._close_capture(open_video)
+
+            if open_video.local_path is not None:
+                os.remove(open_video.local_path)
+                open_video.local_path = None
+                open_video.local_size = 0
+
+
+lazy_frame_decoder = LazyFrameDecoder()
+# Downloaded videos would otherwise outlive the process
+atexit.register(lazy_frame_decoder.close)
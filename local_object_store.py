@@ -0,0 +1,119 @@
+import os
+import shutil
+import hashlib
+import threading
+from io import BytesIO
+
+
+class LocalObjectNotFound(KeyError):
+    pass
+
+
+class LocalObjectResponse(BytesIO):
+    """
+    Mimics the parts of the urllib3 response returned by Minio.get_object that the service uses.
+    """
+
+    def stream(self, amount=2 ** 16):
+        while True:
+            chunk = self.read(amount)
+
+            if not chunk:
+                return
+
+            yield chunk
+
+    def release_conn(self):
+        pass
+
+
+class LocalObjectStat:
+    def __init__(self, object_name, size, etag):
+        self.object_name = object_name
+        self.size = size
+        self.etag = etag
+
+
+class InMemoryObjectStore:
+    """
+    An in-process stand-in for the subset of the Minio client the service uses, for offline benchmarks and tests.
+    """
+
+    def __init__(self):
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, bucket_name, object_name, data, length, **kwargs):
+        content = data.read(length)
+
+        with self._lock:
+            self._objects[(bucket_name, object_name)] = content
+
+    def fput_object(self, bucket_name, object_name, file_path, **kwargs):
+        with open(file_path, 'rb') as file:
+            self.put_object(bucket_name, object_name, file, os.path.getsize(file_path))
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0, **kwargs):
+        content = self._get_content(bucket_name, object_name)
+        end = offset + length if length else len(content)
+
+        return LocalObjectResponse(content[offset:end])
+
+    def stat_object(self, bucket_name, object_name, **kwargs):
+        content = self._get_content(bucket_name, object_name)
+
+        return LocalObjectStat(object_name, len(content), hashlib.md5(content).hexdigest())
+
+    def _get_content(self, bucket_name, object_name):
+        with self._lock:
+            try:
+                return self._objects[(bucket_name, object_name)]
+            except KeyError:
+                raise LocalObjectNotFound(object_name)
+
+
+class FilesystemObjectStore:
+    """
+    Same interface as InMemoryObjectStore, but objects are files under root_path.
+    """
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+
+    def put_object(self, bucket_name, object_name, data, length, **kwargs):
+        object_path = self._object_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+
+        with open(object_path, 'wb') as file:
+            file.write(data.read(length))
+
+    def fput_object(self, bucket_name, object_name, file_path, **kwargs):
+        object_path = self._object_path(bucket_name, object_name)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        shutil.copyfile(file_path, object_path)
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0, **kwargs):
+        with open(self._existing_object_path(bucket_name, object_name), 'rb') as file:
+            file.seek(offset)
+
+            return LocalObjectResponse(file.read(length) if length else file.read())
+
+    def presigned_get_object(self, bucket_name, object_name, **kwargs):
+        # The file itself stands in for the URL a real object store would sign
+        return os.path.abspath(self._existing_object_path(bucket_name, object_name))
+
+    def stat_object(self, bucket_name, object_name, **kwargs):
+        file_stat = os.stat(self._existing_object_path(bucket_name, object_name))
+
+        return LocalObjectStat(object_name, file_stat.st_size, f'{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}')
+
+    def _object_path(self, bucket_name, object_name):
+        return os.path.join(self.root_path, bucket_name, object_name.lstrip('/'))
+
+    def _existing_object_path(self, bucket_name, object_name):
+        object_path = self._object_path(bucket_name, object_name)
+
+        if not os.path.isfile(object_path):
+            raise LocalObjectNotFound(object_name)
+
+        return object_path
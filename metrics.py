@@ -0,0 +1,272 @@
+import os
+import time
+import bisect
+import threading
+from sqlalchemy import event
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra_labels=()):
+    labels = list(zip(label_names, label_values)) + list(extra_labels)
+
+    if not labels:
+        return ''
+
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        label_values = tuple(labels.get(label_name, '') for label_name in self.label_names)
+
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+
+        with self._lock:
+            values = list(self._values.items())
+
+        for label_values, value in values:
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        label_values = tuple(labels.get(label_name, '') for label_name in self.label_names)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(label_values)
+
+            if series is None:
+                # Per bucket (not cumulative) counts, the last one is +Inf, then the sum of all observations
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+
+            series[0][bucket_index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+
+        with self._lock:
+            series_items = [(label_values, list(bucket_counts), total)
+                            for label_values, (bucket_counts, total) in self._series.items()]
+
+        for label_values, bucket_counts, total in series_items:
+            cumulative_count = 0
+
+            for upper_bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative_count += bucket_count
+                bucket_labels = _format_labels(self.label_names, label_values, [('le', _format_value(upper_bound))])
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative_count}')
+
+            series_labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{series_labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{series_labels} {cumulative_count}')
+
+        return lines
+
+
+class CallbackMetric:
+    """
+    A metric read from elsewhere at render time, e.g. counters another component already keeps.
+    """
+
+    def __init__(self, name, help_text, metric_type, collect, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.collect = collect
+        self.label_names = label_names
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.metric_type}']
+        values = self.collect()
+
+        if not isinstance(values, dict):
+            values = {(): values}
+
+        for label_values, value in values.items():
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+
+        with self._lock:
+            metrics = list(self._metrics)
+
+        lines = []
+
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+pipeline_stage_seconds = registry.histogram('videodb_pipeline_stage_seconds',
+                                            'Time spent per call of an ingest stage (a batch for batched stages)',
+                                            ('stage',))
+pipeline_stage_items = registry.counter('videodb_pipeline_stage_items_total', 'Items handled by an ingest stage',
+                                        ('stage',))
+db_queries = registry.counter('videodb_db_queries_total', 'Database statements executed', ('statement',))
+db_query_seconds = registry.histogram('videodb_db_query_seconds', 'Database statement latency', ('statement',))
+db_commit_seconds = registry.histogram('videodb_db_commit_seconds', 'Latency of frame batch commits')
+object_store_requests = registry.counter('videodb_object_store_requests_total', 'Object store requests',
+                                         ('operation',))
+object_store_request_seconds = registry.histogram('videodb_object_store_request_seconds',
+                                                  'Object store request latency (until the response headers for '
+                                                  'reads)', ('operation',))
+object_store_bytes = registry.counter('videodb_object_store_bytes_total',
+                                      'Bytes sent to or read from the object store', ('direction',))
+http_requests = registry.counter('videodb_http_requests_total', 'HTTP requests handled', ('endpoint', 'status'))
+http_request_seconds = registry.histogram('videodb_http_request_seconds',
+                                          'HTTP request latency, until the response is returned by the view',
+                                          ('endpoint',))
+
+
+def instrument_engine(engine):
+    """
+    Count and time every statement executed through the engine.
+    """
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        elapsed_seconds = time.perf_counter() - connection.info['query_start_times'].pop()
+        statement_type = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        db_queries.inc(statement=statement_type)
+        db_query_seconds.observe(elapsed_seconds, statement=statement_type)
+
+
+class _CountingResponse:
+    def __init__(self, response):
+        self._response = response
+
+    def read(self, *args, **kwargs):
+        data = self._response.read(*args, **kwargs)
+        object_store_bytes.inc(len(data), direction='received')
+
+        return data
+
+    def stream(self, *args, **kwargs):
+        for chunk in self._response.stream(*args, **kwargs):
+            object_store_bytes.inc(len(chunk), direction='received')
+
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def __iter__(self):
+        return self.stream()
+
+
+class InstrumentedObjectStore:
+    """
+    Wraps a Minio client (or a local stand-in), counting requests, their latency and the bytes transferred.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def put_object(self, bucket_name, object_name, data, length, **kwargs):
+        with object_store_request_seconds.time(operation='put_object'):
+            result = self._client.put_object(bucket_name, object_name, data, length, **kwargs)
+
+        object_store_requests.inc(operation='put_object')
+        object_store_bytes.inc(max(length, 0), direction='sent')
+
+        return result
+
+    def fput_object(self, bucket_name, object_name, file_path, **kwargs):
+        with object_store_request_seconds.time(operation='fput_object'):
+            result = self._client.fput_object(bucket_name, object_name, file_path, **kwargs)
+
+        object_store_requests.inc(operation='fput_object')
+        object_store_bytes.inc(os.path.getsize(file_path), direction='sent')
+
+        return result
+
+    def get_object(self, bucket_name, object_name, *args, **kwargs):
+        with object_store_request_seconds.time(operation='get_object'):
+            response = self._client.get_object(bucket_name, object_name, *args, **kwargs)
+
+        object_store_requests.inc(operation='get_object')
+
+        return _CountingResponse(response)
+
+    def stat_object(self, bucket_name, object_name, *args, **kwargs):
+        with object_store_request_seconds.time(operation='stat_object'):
+            result = self._client.stat_object(bucket_name, object_name, *args, **kwargs)
+
+        object_store_requests.inc(operation='stat_object')
+
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
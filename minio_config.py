@@ -1,4 +1,18 @@
+import os
 from minio import Minio
+from metrics import InstrumentedObjectStore
 
-minio_client = Minio('localhost:9000', access_key='s3manager', secret_key='s3manager', secure=False)
+# "minio" talks to the real server, "memory" and "filesystem" are local stand-ins for offline benchmarks and tests
+OBJECT_STORE = os.getenv('OBJECT_STORE', 'minio')
+
+if OBJECT_STORE == 'memory':
+    from local_object_store import InMemoryObjectStore
+    minio_client = InMemoryObjectStore()
+elif OBJECT_STORE == 'filesystem':
+    from local_object_store import FilesystemObjectStore
+    minio_client = FilesystemObjectStore(os.getenv('OBJECT_STORE_PATH', 'object_store'))
+else:
+    minio_client = Minio('localhost:9000', access_key='s3manager', secret_key='s3manager', secure=False)
+
+minio_client = InstrumentedObjectStore(minio_client)
 minio_bucket_name = 'bionic'
@@ -1,12 +1,14 @@
 import os
 import sqlalchemy as db
 from dotenv import load_dotenv
+from metrics import instrument_engine
 from sqlalchemy.orm import declarative_base, relationship
 
 load_dotenv()
 
 DB_URI = os.getenv('DB_URI')
 engine = db.create_engine(DB_URI)
+instrument_engine(engine)
 Base = declarative_base()
 
 
@@ -17,6 +19,12 @@ class Video(Base):
     observation_post_name = db.Column('observation_post_name', db.String())
     OS_filepath = db.Column('OS_filepath', db.String())
     frame_count = db.Column('frame_count', db.Integer())
+    updated_at = db.Column('updated_at', db.DateTime())
+    threat_frame_count = db.Column('threat_frame_count', db.Integer())
+    has_threat = db.Column('has_threat', db.Boolean())
+    sampling_mode = db.Column('sampling_mode', db.String())
+    kept_frame_count = db.Column('kept_frame_count', db.Integer())
+    skipped_frame_count = db.Column('skipped_frame_count', db.Integer())
     frames = relationship("Frame", back_populates='video')
 
 
@@ -24,7 +32,7 @@ class FrameMetadata(Base):
     __tablename__ = "frame_metadata"
 
     id = db.Column('id', db.Integer(), primary_key=True)
-    is_threat = db.Column('is_threat', db.Boolean())
+    is_threat = db.Column('is_threat', db.Boolean(), index=True)
     azimuth = db.Column('azimuth', db.Float())
     fov = db.Column('fov', db.Float())
     elevation = db.Column('elevation', db.Float())
@@ -33,14 +41,68 @@ class FrameMetadata(Base):
 
 class Frame(Base):
     __tablename__ = "frames"
+    __table_args__ = (
+        db.Index('ix_frames_video_id_frame_index', 'video_id', 'frame_index'),
+        db.Index('ix_frames_metadata_id', 'metadata_id'),
+    )
 
     id = db.Column('id', db.Integer(), primary_key=True)
     video_id = db.Column('video_id', db.ForeignKey('videos.id'))
     metadata_id = db.Column('metadata_id', db.ForeignKey('frame_metadata.id'))
     OS_filepath = db.Column('OS_filepath', db.String())
     frame_index = db.Column('frame_index', db.Integer())
+    segment_OS_filepath = db.Column('segment_OS_filepath', db.String())
+    segment_offset = db.Column('segment_offset', db.BigInteger())
+    segment_length = db.Column('segment_length', db.Integer())
+    source_OS_filepath = db.Column('source_OS_filepath', db.String())
     video = relationship("Video", back_populates="frames")
     frame_metadata = relationship("FrameMetadata", back_populates="frame", uselist=False)
 
 
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = db.Column('id', db.Integer(), primary_key=True)
+    video_file_path = db.Column('video_file_path', db.String())
+    video_id = db.Column('video_id', db.ForeignKey('videos.id'))
+    status = db.Column('status', db.String())
+    sampling_mode = db.Column('sampling_mode', db.String())
+    sampling_parameter = db.Column('sampling_parameter', db.Float())
+    frame_storage_layout = db.Column('frame_storage_layout', db.String())
+    stage = db.Column('stage', db.String())
+    total_frames = db.Column('total_frames', db.Integer())
+    frames_processed = db.Column('frames_processed', db.Integer(), default=0)
+    stage_seconds = db.Column('stage_seconds', db.JSON())
+    error = db.Column('error', db.String())
+    created_at = db.Column('created_at', db.DateTime())
+    started_at = db.Column('started_at', db.DateTime())
+    updated_at = db.Column('updated_at', db.DateTime())
+
+
+def upgrade_schema(engine):
+    """
+    Bring tables created by an earlier version up to date, create_all only creates the tables that are missing.
+
+    Columns and indexes the models have but the tables lack are added. Every added column is nullable, so existing
+    rows are kept as they are (e.g. videos ingested before threat counts were kept have a NULL threat_frame_count).
+    """
+
+    inspector = db.inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing_column_names = {column['name'] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name not in existing_column_names:
+                    connection.execute(db.text(f'ALTER TABLE {preparer.format_table(table)} '
+                                               f'ADD COLUMN {preparer.format_column(column)} '
+                                               f'{column.type.compile(dialect=engine.dialect)}'))
+
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
 Base.metadata.create_all(engine)
+upgrade_schema(engine)
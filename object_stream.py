@@ -0,0 +1,43 @@
+import os
+from zip_stream import prefetch
+from minio_config import minio_client, minio_bucket_name
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_KB', 256)) * 1024
+DOWNLOAD_READ_AHEAD_CHUNKS = int(os.getenv('DOWNLOAD_READ_AHEAD_CHUNKS', 4))
+
+
+def stream_object_range(object_name, start, stop, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                        read_ahead_chunks=DOWNLOAD_READ_AHEAD_CHUNKS):
+    """
+    Stream a byte range of an object with a single ranged GET.
+
+    The next chunks are read while the current one is sent, up to read_ahead_chunks of them, so a download holds at
+    most that much memory however large the object is.
+
+    :param object_name: The object's path in the bucket.
+    :param start: The first byte to send.
+    :param stop: The byte after the last one to send.
+    :return: A generator of the range's byte chunks.
+    """
+
+    if stop <= start:
+        return
+
+    object_response = minio_client.get_object(minio_bucket_name, object_name, offset=start, length=stop - start)
+    chunk_count = (stop - start + chunk_size - 1) // chunk_size
+    # A single reader keeps the reads of the response in order
+    chunks = prefetch(range(chunk_count), lambda _: object_response.read(chunk_size), workers=1,
+                      depth=read_ahead_chunks)
+
+    try:
+        for _, chunk in chunks:
+            if not chunk:
+                break
+
+            yield chunk
+    finally:
+        # Also runs when the client disconnects mid-download, the connection then goes back to the pool closed.
+        # The response is not thread-safe, closing the prefetch first waits for a read in progress to finish
+        chunks.close()
+        object_response.close()
+        object_response.release_conn()
@@ -0,0 +1,48 @@
+import json
+import base64
+import binascii
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_key):
+    """
+    Encode the key of the last returned row as an opaque cursor token.
+
+    :param last_key: A JSON serializable key, e.g. the last frame index.
+    :return: The token, or None if there is no next page.
+    """
+
+    if last_key is None:
+        return None
+
+    return base64.urlsafe_b64encode(json.dumps({'after': last_key}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor token created by encode_cursor.
+
+    :param cursor: The token, or None for the first page.
+    :return: The key rows must come after, or None for the first page.
+    """
+
+    if not cursor:
+        return None
+
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))['after']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor(f'Invalid cursor: "{cursor}"')
+
+
+def parse_page_size(limit):
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
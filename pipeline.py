@@ -0,0 +1,224 @@
+import time
+import queue
+import logging
+import threading
+from metrics import pipeline_stage_seconds, pipeline_stage_items
+
+_END_OF_STREAM = object()
+_POLL_INTERVAL_SECONDS = 0.1
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class StageTimer:
+    """
+    Accumulates the time spent in, and the items handled by, every pipeline stage.
+
+    Every record is also exported to the process wide stage metrics.
+    """
+
+    def __init__(self):
+        self.stage_seconds = {}
+        self.stage_items = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage_name, seconds, item_count):
+        with self._lock:
+            self.stage_seconds[stage_name] = self.stage_seconds.get(stage_name, 0) + seconds
+            self.stage_items[stage_name] = self.stage_items.get(stage_name, 0) + item_count
+
+        pipeline_stage_seconds.observe(seconds, stage=stage_name)
+        pipeline_stage_items.inc(item_count, stage=stage_name)
+
+
+def timed_source(source, stage_timer, stage_name):
+    """
+    Wrap a source iterable, recording the time spent producing every item as a stage of its own.
+    """
+
+    source = iter(source)
+
+    while True:
+        start_time = time.perf_counter()
+        item = next(source, _END_OF_STREAM)
+
+        if item is _END_OF_STREAM:
+            return
+
+        stage_timer.record(stage_name, time.perf_counter() - start_time, 1)
+
+        yield item
+
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues.
+
+    Every stage runs in its own worker threads and blocks when its output queue is full, so the amount of
+    in-flight items is bounded by the queue sizes and not by the length of the input stream.
+    """
+
+    def __init__(self, queue_size=32, stage_timer=None):
+        self.queue_size = queue_size
+        self.stage_timer = stage_timer
+        self._stages = []
+        self._abort_event = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    def add_stage(self, name, func, workers=1, on_finish=None, batch_size=None):
+        """
+        Append a stage to the pipeline.
+
+        :param name: The stage name, used for thread names and logging.
+        :param func: Called with each item, returns the item to pass downstream or None to drop it.
+        :param workers: The number of threads running the stage.
+        :param on_finish: Optional callable, invoked once after the stage has consumed its whole input.
+                          It may return an iterable of remaining items to pass downstream.
+        :param batch_size: If set, func is called with lists of up to batch_size items that are already queued,
+                           and returns an iterable of the items to pass downstream.
+        :return: The pipeline, to allow chaining.
+        """
+
+        self._stages.append((name, func, workers, on_finish, batch_size))
+
+        return self
+
+    def run(self, source):
+        """
+        Feed the source through all stages and wait for them to drain.
+
+        :param source: An iterable of items, consumed lazily from the calling thread.
+        :return: The number of items read from the source.
+        """
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self._stages]
+        threads = []
+
+        for stage_index, (name, func, workers, on_finish, batch_size) in enumerate(self._stages):
+            in_queue = queues[stage_index]
+            out_queue = queues[stage_index + 1] if stage_index + 1 < len(queues) else None
+            stage_state = {'running_workers': workers, 'lock': threading.Lock()}
+
+            for worker_index in range(workers):
+                thread = threading.Thread(target=self._run_worker, name=f'{name}-{worker_index}', daemon=True,
+                                          args=(name, func, on_finish, batch_size, in_queue, out_queue,
+                                                stage_state))
+                thread.start()
+                threads.append(thread)
+
+        source_item_count = 0
+
+        try:
+            for item in source:
+                self._put(queues[0], item)
+                source_item_count += 1
+
+            self._put(queues[0], _END_OF_STREAM)
+        except PipelineAborted:
+            pass
+        except BaseException as error:
+            self._fail(error)
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+        return source_item_count
+
+    def _run_worker(self, name, func, on_finish, batch_size, in_queue, out_queue, stage_state):
+        try:
+            while True:
+                items, reached_end = self._get_items(in_queue, batch_size)
+
+                if items:
+                    start_time = time.perf_counter()
+                    results = func(items) if batch_size else [func(items[0])]
+
+                    if self.stage_timer is not None:
+                        self.stage_timer.record(name, time.perf_counter() - start_time, len(items))
+
+                    for result in results:
+                        if result is not None and out_queue is not None:
+                            self._put(out_queue, result)
+
+                if reached_end:
+                    # Put the marker back so the sibling workers of this stage stop as well
+                    self._put(in_queue, _END_OF_STREAM)
+
+                    with stage_state['lock']:
+                        stage_state['running_workers'] -= 1
+                        is_last_worker = stage_state['running_workers'] == 0
+
+                    if is_last_worker:
+                        start_time = time.perf_counter()
+                        remaining_items = on_finish() if on_finish is not None else None
+
+                        if self.stage_timer is not None:
+                            self.stage_timer.record(name, time.perf_counter() - start_time, 0)
+
+                        for remaining_item in remaining_items or ():
+                            if out_queue is not None:
+                                self._put(out_queue, remaining_item)
+
+                        if out_queue is not None:
+                            self._put(out_queue, _END_OF_STREAM)
+
+                    return
+        except PipelineAborted:
+            pass
+        except BaseException as error:
+            logging.exception(f'Pipeline stage "{name}" failed')
+            self._fail(error)
+
+    def _get_items(self, source_queue, batch_size):
+        item = self._get(source_queue)
+
+        if item is _END_OF_STREAM:
+            return [], True
+
+        items = [item]
+
+        # Only take what is already waiting, a batch never delays an item that could be processed now
+        while batch_size and len(items) < batch_size:
+            try:
+                item = source_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is _END_OF_STREAM:
+                return items, True
+
+            items.append(item)
+
+        return items, False
+
+    def _fail(self, error):
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+
+        self._abort_event.set()
+
+    def _put(self, target_queue, item):
+        while not self._abort_event.is_set():
+            try:
+                target_queue.put(item, timeout=_POLL_INTERVAL_SECONDS)
+                return
+            except queue.Full:
+                pass
+
+        raise PipelineAborted()
+
+    def _get(self, source_queue):
+        while not self._abort_event.is_set():
+            try:
+                return source_queue.get(timeout=_POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                pass
+
+        raise PipelineAborted()
@@ -0,0 +1,132 @@
+import os
+import cv2
+import math
+import numpy as np
+
+SAMPLE_ALL = 'all'
+SAMPLE_STRIDE = 'stride'
+SAMPLE_KEYFRAME = 'keyframe'
+SAMPLE_DEDUP = 'dedup'
+SAMPLING_MODES = (SAMPLE_ALL, SAMPLE_STRIDE, SAMPLE_KEYFRAME, SAMPLE_DEDUP)
+
+DEFAULT_SAMPLING_MODE = os.getenv('SAMPLING_MODE', SAMPLE_ALL)
+SIGNATURE_GRID_SIZE = 32
+DEFAULT_SAMPLING_PARAMETERS = {
+    SAMPLE_ALL: None,
+    # Keep every n-th frame
+    SAMPLE_STRIDE: 5,
+    # Mean gray level difference from the last kept frame that starts a new shot
+    SAMPLE_KEYFRAME: 30,
+    # Gray level difference in any grid cell from the last kept frame that makes a frame new, a change in a small
+    # part of the image (e.g. a threat entering) keeps the frame even if the rest of it is static
+    SAMPLE_DEDUP: 12,
+}
+
+
+def frame_signature(frame):
+    """
+    Downscale a frame to a small grayscale grid, every cell holding the mean brightness of its region.
+
+    :param frame: The frame (BGR numpy array).
+    :return: A SIGNATURE_GRID_SIZE x SIGNATURE_GRID_SIZE int16 array.
+    """
+
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    return cv2.resize(gray_frame, (SIGNATURE_GRID_SIZE, SIGNATURE_GRID_SIZE),
+                      interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class FrameSampler:
+    """
+    Decides which decoded frames are kept by the ingest.
+
+    all: every frame. stride: every n-th frame. dedup: frames where some region differs enough from the last kept
+    frame. keyframe: the first frame of every shot, a shot starting when the whole frame differs strongly from the
+    last kept frame.
+    OpenCV doesn't expose the codec's keyframe flags for decoded frames, so shots are detected from the image itself.
+    The first frame is always kept, so every frame index resolves to a kept frame at or before it.
+    """
+
+    def __init__(self, mode=DEFAULT_SAMPLING_MODE, parameter=None):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f'Unknown sampling mode "{mode}", expected one of {", ".join(SAMPLING_MODES)}')
+
+        self.mode = mode
+        self.parameter = self._parse_parameter(mode, parameter)
+
+        self.kept_frame_count = 0
+        self.skipped_frame_count = 0
+        self._last_kept_signature = None
+
+    @staticmethod
+    def _parse_parameter(mode, parameter):
+        if mode == SAMPLE_ALL:
+            return None
+
+        if parameter is None:
+            return DEFAULT_SAMPLING_PARAMETERS[mode]
+
+        # Parameters come from JSON requests, numeric strings like "5" are accepted, other types are bad input
+        if isinstance(parameter, bool) or not isinstance(parameter, (int, float, str)):
+            raise ValueError(f'The {mode} sampling parameter must be a number')
+
+        try:
+            parameter = float(parameter)
+        except ValueError:
+            raise ValueError(f'The {mode} sampling parameter must be a number')
+
+        if mode == SAMPLE_STRIDE:
+            if not parameter.is_integer() or parameter < 1:
+                raise ValueError(f'The {mode} sampling parameter must be a whole number of at least 1')
+
+            return int(parameter)
+
+        # A difference threshold, anything above 0 is meaningful (below 1 only drops near exact duplicates)
+        if not math.isfinite(parameter) or parameter <= 0:
+            raise ValueError(f'The {mode} sampling parameter must be a positive number')
+
+        return parameter
+
+    def should_keep(self, frame_index, frame):
+        keep = self._should_keep(frame_index, frame)
+
+        if keep:
+            self.kept_frame_count += 1
+        else:
+            self.skipped_frame_count += 1
+
+        return keep
+
+    def sample(self, video_frames, on_skip=None):
+        """
+        Filter (frame index, frame) tuples down to the kept ones.
+
+        :param on_skip: Optional callable, invoked with the index of every skipped frame.
+        """
+
+        for frame_index, frame in video_frames:
+            if self.should_keep(frame_index, frame):
+                yield frame_index, frame
+            elif on_skip is not None:
+                on_skip(frame_index)
+
+    def _should_keep(self, frame_index, frame):
+        if self.mode == SAMPLE_ALL:
+            return True
+
+        if self.mode == SAMPLE_STRIDE:
+            return frame_index % self.parameter == 0
+
+        signature = frame_signature(frame)
+
+        if self._last_kept_signature is not None:
+            cell_differences = np.abs(signature - self._last_kept_signature)
+            difference = cell_differences.mean() if self.mode == SAMPLE_KEYFRAME else cell_differences.max()
+
+            if difference < self.parameter:
+                return False
+
+        self._last_kept_signature = signature
+
+        return True
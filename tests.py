@@ -1,7 +1,31 @@
+import os
 import cv2
+import time
+import threading
+import base64
+import functools
 import pytest
-from models import Video, FrameMetadata, Frame, session
-from app import app, save_video, save_frame_metadata, save_frame
+import zipfile
+import sqlalchemy
+import numpy as np
+from io import BytesIO
+from multiprocessing import shared_memory
+from PIL import Image
+from cache import LRUCache
+from sampling import FrameSampler
+from frame_writer import FrameWriter
+from lazy_frames import LazyFrameDecoder
+from frame_storage import read_frame_bytes
+from threat_detection import ThreatCascade, ThreatDetector, _detect_shared_batch
+from concurrent.futures.process import BrokenProcessPool
+from given_functions import is_frame_tagged, SKULL_IMAGE_BASE64
+from sqlalchemy.orm import Session
+from models import Base, Video, Frame, IngestJob, engine, upgrade_schema
+from metrics import registry, MetricsRegistry, CallbackMetric
+from pagination import encode_cursor
+from zip_stream import prefetch, stream_stored_zip
+from object_stream import stream_object_range
+from app import app, db_service, job_manager, profiler_lock, IngestFrame
 
 
 @pytest.fixture
@@ -10,48 +34,690 @@ def client():
         yield client
 
 
-def test_upload_video_from_local_path(client):
-    response = client.post('/video', json={'path': 'test_video.mp4'})
-    assert response.status_code == 200
-    assert response.get_data(as_text=True) == 'Success'
+class GrayLevelThreatDetector:
+    # Test frames are filled with a gray level of ten times their index, every third of them is a threat
+    workers = 1
+
+    def detect_batch(self, frames):
+        return [int(frame[0, 0, 0]) // 10 % 3 == 0 for frame in frames]
+
 
-    video = session.query(Video).first()
+def test_upload_video_from_local_path(client, test_video_path):
+    response = client.post('/video', json={'path': test_video_path})
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+    job_manager.wait(job_id)
+
+    job_response = client.get(f'/jobs/{job_id}')
+    assert job_response.status_code == 200
+    assert job_response.json['status'] == 'completed'
+    assert job_response.json['frames_processed'] == 466
+
+    video = db_service.get_video_by_id(job_response.json['video_id'])
     assert video is not None
     assert video.observation_post_name == 'test'
     assert video.OS_filepath == f'/videos/{video.id}_test_video.mp4'
     assert video.frame_count == 466
 
 
-def test_save_video(client):
-    video_path = 'test_video.mp4'
-    video_filename = 'test_video.mp4'
-    video = save_video(video_path, video_filename)
+def test_lazy_frames_are_decoded_from_the_stored_video(client, test_video_path):
+    response = client.post('/video', json={'path': test_video_path, 'frame_storage_layout': 'lazy'})
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+    job_manager.wait(job_id)
+
+    job_response = client.get(f'/jobs/{job_id}')
+    assert job_response.json['status'] == 'completed'
+    video_id = job_response.json['video_id']
+
+    image_response = client.get(f'/video/{video_id}/frames/100/image')
+    assert image_response.status_code == 200
+    assert image_response.mimetype == 'image/jpeg'
+    assert cv2.imdecode(np.frombuffer(image_response.data, np.uint8), cv2.IMREAD_COLOR) is not None
+
+
+def test_lazy_frame_downloads_are_capped(test_video_path, tmp_path):
+    first_video = db_service.save_video(test_video_path, 'test_video.mp4')
+    second_video = db_service.save_video(test_video_path, 'test_video.mp4')
+    # The in-memory object store has no URLs, so videos are downloaded, and the cap leaves room for only one
+    decoder = LazyFrameDecoder(cache_dir=str(tmp_path), max_download_bytes=1)
+
+    try:
+        decoder.read_frame_bytes(first_video.OS_filepath, 10)
+        decoder.read_frame_bytes(second_video.OS_filepath, 10)
+
+        assert len(list(tmp_path.iterdir())) == 1
+        assert decoder.read_frame_bytes(first_video.OS_filepath, 20)
+    finally:
+        decoder.close()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unfinished_jobs_resume_on_the_first_request(client, monkeypatch, test_video_path):
+    # A job the previous server process was running when it stopped
+    with db_service.Session() as session:
+        job = IngestJob(video_file_path=test_video_path, frame_storage_layout='lazy', status='running',
+                        stage='processing_frames', frames_processed=0)
+        session.add(job)
+        session.commit()
+
+    monkeypatch.setattr('app.jobs_resumed', False)
+    client.get('/metrics')
+    job_manager.wait(job.id)
+
+    job_response = client.get(f'/jobs/{job.id}')
+    assert job_response.json['status'] == 'completed'
+    assert job_response.json['frames_processed'] == 466
+
+
+def test_job_progress_is_saved_while_frames_are_written(client, monkeypatch, test_video_path):
+    # Small batches keep the frame writer's transaction open while progress is saved, which locks SQLite unless the
+    # progress is written by the writer itself
+    monkeypatch.setattr('app.FrameWriter', functools.partial(FrameWriter, batch_size=5, commit_interval=3))
+    monkeypatch.setattr('jobs.PROGRESS_SAVE_INTERVAL_SECONDS', 0)
+
+    response = client.post('/video', json={'path': test_video_path, 'frame_storage_layout': 'lazy'})
+    job_manager.wait(response.json['job_id'])
+
+    job_response = client.get(f'/jobs/{response.json["job_id"]}')
+    assert job_response.json['error'] is None
+    assert job_response.json['status'] == 'completed'
+    assert job_response.json['frames_processed'] == 466
+
+
+def test_sampled_job_progress_counts_skipped_frames(client, test_video_path):
+    response = client.post('/video', json={'path': test_video_path, 'frame_storage_layout': 'lazy',
+                                           'sampling_mode': 'stride', 'sampling_parameter': 10})
+    job_manager.wait(response.json['job_id'])
+
+    job_response = client.get(f'/jobs/{response.json["job_id"]}')
+    assert job_response.json['status'] == 'completed'
+    assert job_response.json['frames_processed'] == job_response.json['total_frames'] == 466
+
+    video_response = client.get('/videos', query_string={'limit': 1000})
+    video, = [video for video in video_response.json['items'] if video['id'] == job_response.json['video_id']]
+    assert video['frame_count'] == 466
+
+
+def test_save_video(client, test_video_path):
+    video = db_service.save_video(test_video_path, 'test_video.mp4')
 
     assert video is not None
     assert video.observation_post_name == 'test'
 
 
+def test_download_video_range(client, test_video_path):
+    video = db_service.save_video(test_video_path, 'test_video.mp4')
+
+    with open(test_video_path, 'rb') as video_file:
+        video_bytes = video_file.read()
+
+    response = client.get(f'/video/{video.id}/download', headers={'Range': 'bytes=100-199'})
+    assert response.status_code == 206
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(video_bytes)}'
+    assert response.data == video_bytes[100:200]
+
+    not_modified_response = client.get(f'/video/{video.id}/download',
+                                       headers={'If-None-Match': response.headers['ETag']})
+    assert not_modified_response.status_code == 304
+
+
+def test_interrupted_range_stream_stops_reading_before_closing(monkeypatch):
+    events = []
+
+    class SlowObjectResponse:
+        def read(self, size):
+            time.sleep(0.01)
+            events.append('read')
+
+            return b'0' * size
+
+        def close(self):
+            events.append('close')
+
+        def release_conn(self):
+            events.append('release_conn')
+
+    class ObjectStore:
+        def get_object(self, bucket_name, object_name, offset=0, length=0):
+            return SlowObjectResponse()
+
+    monkeypatch.setattr('object_stream.minio_client', ObjectStore())
+
+    # The client disconnecting after the first chunk, while the next ones are being read
+    chunks = stream_object_range('/videos/test_video.mp4', 0, 1000, chunk_size=10, read_ahead_chunks=4)
+    assert next(chunks) == b'0' * 10
+    chunks.close()
+
+    time.sleep(0.05)
+    assert events[-2:] == ['close', 'release_conn']
+
+
+def test_download_video_file_name_is_quoted(client, test_video_path):
+    video = db_service.save_video(test_video_path, 'test_gate 1; nörth.mp4')
+
+    response = client.get(f'/video/{video.id}/download')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == f'attachment; filename="{video.id}_test_gate 1; north.mp4"; ' \
+                                                      f"filename*=UTF-8''{video.id}_test_gate%201%3B%20n%C3%B6rth.mp4"
+
+
+def test_streamed_zip_round_trips_through_zipfile():
+    entries = [(f'frame_{frame_index}.jpg', bytes([frame_index]) * frame_index * 1000) for frame_index in range(10)]
+    chunks = list(stream_stored_zip(iter(entries)))
+
+    # Streamed entry by entry, not built whole and sent as one chunk
+    assert len(chunks) > len(entries)
+
+    with zipfile.ZipFile(BytesIO(b''.join(chunks))) as zf:
+        assert zf.testzip() is None
+        assert [(info.filename, zf.read(info)) for info in zf.infolist()] == entries
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zf.infolist())
+
+
+def test_prefetch_keeps_the_order_of_items():
+    def fetch(item):
+        # The later items of every window are fetched first
+        time.sleep((4 - item % 4) * 0.002)
+
+        return item * 2
+
+    assert list(prefetch(range(50), fetch, workers=4, depth=8)) == [(item, item * 2) for item in range(50)]
+
+
+def test_download_threat_frames_streams_a_valid_zip(client, monkeypatch):
+    monkeypatch.setattr('app.threat_detector', GrayLevelThreatDetector())
+
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    frames = [np.full((64, 64, 3), frame_index * 10, dtype=np.uint8) for frame_index in range(20)]
+    db_service.save_video_frames(iter(frames), video_instance.id, 'test_video.mp4', frame_storage_layout='object')
+    db_service.update_video_frame_count(video_instance.id, len(frames))
+
+    response = client.get(f'/video/{video_instance.id}/download_threat_frames')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=threat_frames.zip'
+
+    with zipfile.ZipFile(BytesIO(response.data)) as zf:
+        assert zf.namelist() == [f'frame_{frame_index}.jpg' for frame_index in range(0, 20, 3)]
+
+        for frame_index in range(0, 20, 3):
+            image = cv2.imdecode(np.frombuffer(zf.read(f'frame_{frame_index}.jpg'), np.uint8), cv2.IMREAD_COLOR)
+            assert abs(image.mean() - frame_index * 10) < 3
+
+
+def get_all_pages(client, url, **query_args):
+    items, page_sizes, cursor = [], [], None
+
+    while True:
+        response = client.get(url, query_string={**query_args, 'cursor': cursor} if cursor else query_args)
+        assert response.status_code == 200
+        items.extend(response.json['items'])
+        page_sizes.append(len(response.json['items']))
+        cursor = response.json['next_cursor']
+
+        if cursor is None:
+            return items, page_sizes
+
+
+def test_video_frames_pages(client, monkeypatch):
+    monkeypatch.setattr('app.threat_detector', GrayLevelThreatDetector())
+
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    frames = [np.full((64, 64, 3), frame_index * 10, dtype=np.uint8) for frame_index in range(20)]
+    db_service.save_video_frames(iter(frames), video_instance.id, 'test_video.mp4', frame_storage_layout='object')
+    db_service.update_video_frame_count(video_instance.id, len(frames))
+    frames_url = f'/video/{video_instance.id}/frames'
+
+    items, page_sizes = get_all_pages(client, frames_url, limit=6)
+    assert [item['frame_index'] for item in items] == list(range(20))
+    assert page_sizes == [6, 6, 6, 2]
+
+    items, page_sizes = get_all_pages(client, frames_url, limit=3, threat_only='true')
+    assert [item['frame_index'] for item in items] == list(range(0, 20, 3))
+    assert all(item['is_threat'] for item in items)
+    assert page_sizes == [3, 3, 1]
+
+    # start_index is inclusive and end_index exclusive
+    items, page_sizes = get_all_pages(client, frames_url, limit=2, start_index=5, end_index=12, threat_only='1')
+    assert [item['frame_index'] for item in items] == [6, 9]
+    assert page_sizes == [2]
+
+    items, _ = get_all_pages(client, frames_url, limit=4, start_index=15)
+    assert [item['frame_index'] for item in items] == list(range(15, 20))
+
+    # A page that ends exactly at the last frame has no next page
+    response = client.get(frames_url, query_string={'limit': 5, 'start_index': 15})
+    assert response.json['next_cursor'] is None
+
+    for bad_query_args in ({'cursor': 'not a cursor'}, {'cursor': encode_cursor('frame_3')}, {'limit': 'many'},
+                           {'start_index': 'first'}):
+        assert client.get(frames_url, query_string=bad_query_args).status_code == 400
+
+    assert client.get('/video/0/frames').status_code == 404
+
+
+def test_videos_pages(client):
+    with db_service.Session() as session:
+        session.add_all([Video(observation_post_name='test', OS_filepath=f'/videos/test_video_{video_number}.mp4')
+                         for video_number in range(5)])
+        session.commit()
+        video_ids = [video_id for video_id, in session.query(Video.id).order_by(Video.id)]
+
+    items, page_sizes = get_all_pages(client, '/videos', limit=2)
+    assert [item['id'] for item in items] == video_ids
+    assert set(page_sizes[:-1]) == {2}
+    assert client.get('/videos', query_string={'cursor': 'not a cursor'}).status_code == 400
+
+
 def test_save_frame_metadata():
     frame = cv2.imread('test_frame.jpg')
-    metadata = save_frame_metadata(frame)
+    ingest_frame, = db_service.detect_frames([IngestFrame(0, frame)])
 
-    assert metadata is not None
-    assert metadata.is_threat is not None
-    assert metadata.fov is not None
-    assert metadata.azimuth is not None
-    assert metadata.elevation is not None
+    assert ingest_frame.is_threat is not None
+    assert ingest_frame.fov is not None
+    assert ingest_frame.azimuth is not None
+    assert ingest_frame.elevation is not None
 
 
 def test_save_frame(client):
-    video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4', frame_count=5)
-    session.add(video_instance)
-    session.commit()
-    cv_frame = cv2.imread('test_frame.jpg')
-    frame_instance = save_frame(cv_frame, 0, video_instance, 'test_video.mp4')
-    session.commit()
-
-    saved_frame = session.query(Frame).get(frame_instance.id)
-    assert saved_frame is not None
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4', frame_count=5)
+        session.add(video_instance)
+        session.commit()
+
+    ingest_frame, = db_service.detect_frames([IngestFrame(0, cv2.imread('test_frame.jpg'))])
+    ingest_frame = db_service.upload_frame(db_service.encode_frame(ingest_frame), video_instance.id, 'test_video.mp4')
+    frame_writer = FrameWriter(engine, video_instance.id)
+    frame_writer.add(ingest_frame)
+    frame_writer.flush()
+
+    with db_service.Session() as session:
+        saved_frame = session.query(Frame).filter(Frame.video_id == video_instance.id).one()
+
     assert saved_frame.OS_filepath == f'/frames/{video_instance.id}_test_video.mp4/frame_0.jpg'
     assert saved_frame.video_id == video_instance.id
     assert saved_frame.frame_index == 0
+
+
+def test_resumed_segment_ingest_keeps_committed_frames():
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    # Every frame is a distinct shade of gray, so a frame read back from the wrong segment bytes is detected
+    frames = [np.full((64, 64, 3), frame_index * 10, dtype=np.uint8) for frame_index in range(20)]
+
+    # The state a crash leaves behind: the first frames and their segments are committed, the rest is not
+    db_service.save_video_frames(iter(frames[:10]), video_instance.id, 'test_video.mp4', frame_storage_layout='segment')
+    persisted_frame_indexes = db_service.get_persisted_frame_indexes(video_instance.id)
+    assert persisted_frame_indexes == set(range(10))
+    db_service.save_video_frames(iter(frames), video_instance.id, 'test_video.mp4',
+                                 persisted_frame_indexes=persisted_frame_indexes, frame_storage_layout='segment')
+
+    with db_service.Session() as session:
+        saved_frames = session.query(Frame).filter(Frame.video_id == video_instance.id) \
+            .order_by(Frame.frame_index).all()
+
+    assert [saved_frame.frame_index for saved_frame in saved_frames] == list(range(20))
+
+    for saved_frame in saved_frames:
+        image = cv2.imdecode(np.frombuffer(read_frame_bytes(saved_frame), np.uint8), cv2.IMREAD_COLOR)
+        assert abs(image.mean() - saved_frame.frame_index * 10) < 3
+
+
+def test_detection_frames_in_flight_are_capped(monkeypatch):
+    in_flight_lock = threading.Lock()
+    in_flight = {'frames': 0, 'peak': 0}
+
+    class ManyCoreDetector:
+        workers = 64
+
+        def detect_batch(self, frames):
+            with in_flight_lock:
+                in_flight['frames'] += len(frames)
+                in_flight['peak'] = max(in_flight['peak'], in_flight['frames'])
+
+            time.sleep(0.01)
+
+            with in_flight_lock:
+                in_flight['frames'] -= len(frames)
+
+            return [False] * len(frames)
+
+    monkeypatch.setattr('app.threat_detector', ManyCoreDetector())
+    monkeypatch.setattr('app.detection_max_in_flight_frames', 16)
+
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    frames = (np.zeros((16, 16, 3), dtype=np.uint8) for _ in range(200))
+    assert db_service.save_video_frames(frames, video_instance.id, 'test_video.mp4', frame_storage_layout='lazy') == 200
+    assert 0 < in_flight['peak'] <= 16
+
+
+def test_frame_paths_of_segment_frames_are_fetchable(client):
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    frames = [np.full((64, 64, 3), frame_index * 10, dtype=np.uint8) for frame_index in range(3)]
+    db_service.save_video_frames(iter(frames), video_instance.id, 'test_video.mp4', frame_storage_layout='segment')
+    db_service.update_video_frame_count(video_instance.id, len(frames))
+
+    # Segment frames have no object of their own, so their paths point at the image endpoint
+    frame_path = client.get(f'/video/{video_instance.id}/frames/1/path').get_data(as_text=True)
+    assert frame_path == f'/video/{video_instance.id}/frames/1/image'
+    assert client.get(f'/video/{video_instance.id}/frames/path').json[1] == frame_path
+    assert client.get(f'/video/{video_instance.id}/frames').json['items'][1]['path'] == frame_path
+
+    image_response = client.get(frame_path)
+    assert image_response.status_code == 200
+    assert image_response.mimetype == 'image/jpeg'
+
+
+def test_sampling_parameter_validation(client):
+    assert FrameSampler('stride', '5').parameter == 5
+    assert FrameSampler('dedup', 0.5).parameter == 0.5
+
+    for mode, parameter in (('stride', 2.5), ('stride', 0), ('dedup', 'many'), ('keyframe', -1), ('dedup', [1])):
+        with pytest.raises(ValueError):
+            FrameSampler(mode, parameter)
+
+    response = client.post('/video', json={'path': 'test_video.mp4', 'sampling_mode': 'stride',
+                                           'sampling_parameter': 'five'})
+    assert response.status_code == 400
+
+
+def make_shot_frames():
+    # Two static shots, then a small bright object entering the second one
+    frames = [np.full((64, 64, 3), 50 if frame_index < 4 else 150, dtype=np.uint8) for frame_index in range(12)]
+
+    for frame in frames[8:]:
+        frame[:8, :8] = 255
+
+    return frames
+
+
+@pytest.mark.parametrize('mode, parameter, kept_frame_indexes', [
+    ('all', None, list(range(12))),
+    ('stride', None, [0, 5, 10]),
+    ('stride', 4, [0, 4, 8]),
+    ('keyframe', None, [0, 4]),
+    ('dedup', None, [0, 4, 8]),
+    ('dedup', 0.5, [0, 4, 8]),
+])
+def test_sampling_modes(mode, parameter, kept_frame_indexes):
+    frame_sampler = FrameSampler(mode, parameter)
+    kept_frames = list(frame_sampler.sample(enumerate(make_shot_frames())))
+
+    assert [frame_index for frame_index, _ in kept_frames] == kept_frame_indexes
+    assert frame_sampler.kept_frame_count == len(kept_frame_indexes)
+    assert frame_sampler.skipped_frame_count == 12 - len(kept_frame_indexes)
+
+
+def test_skipped_frames_resolve_to_the_last_kept_frame(client):
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    frame_sampler = FrameSampler('dedup')
+    frames = make_shot_frames()
+    db_service.save_video_frames(iter(frames), video_instance.id, 'test_video.mp4', frame_storage_layout='object',
+                                 frame_sampler=frame_sampler)
+    db_service.update_video_frame_count(video_instance.id, len(frames))
+    db_service.update_video_sampling(video_instance.id, frame_sampler)
+
+    assert db_service.get_persisted_frame_indexes(video_instance.id) == {0, 4, 8}
+
+    for frame_index, kept_frame_index in ((0, 0), (3, 0), (4, 4), (7, 4), (11, 8)):
+        frame_path = client.get(f'/video/{video_instance.id}/frames/{frame_index}/path').get_data(as_text=True)
+        assert frame_path == f'/frames/{video_instance.id}_test_video.mp4/frame_{kept_frame_index}.jpg'
+
+    image_response = client.get(f'/video/{video_instance.id}/frames/6/image')
+    assert image_response.data == client.get(f'/video/{video_instance.id}/frames/4/image').data
+
+    # Past the end of the video there is no frame to resolve to
+    assert client.get(f'/video/{video_instance.id}/frames/12/path').status_code == 404
+
+    with db_service.Session() as session:
+        saved_video = session.get(Video, video_instance.id)
+        assert (saved_video.sampling_mode, saved_video.kept_frame_count, saved_video.skipped_frame_count) == \
+            ('dedup', 3, 9)
+
+
+def test_upgrade_schema_adds_new_columns_and_indexes(tmp_path):
+    old_engine = sqlalchemy.create_engine(f'sqlite:///{tmp_path / "old.db"}')
+
+    # The tables as the first version of the service created them
+    with old_engine.begin() as connection:
+        connection.execute(sqlalchemy.text('CREATE TABLE videos (id INTEGER PRIMARY KEY, observation_post_name '
+                                           'VARCHAR, "OS_filepath" VARCHAR, frame_count INTEGER)'))
+        connection.execute(sqlalchemy.text('CREATE TABLE frame_metadata (id INTEGER PRIMARY KEY, is_threat BOOLEAN, '
+                                           'azimuth FLOAT, fov FLOAT, elevation FLOAT)'))
+        connection.execute(sqlalchemy.text('CREATE TABLE frames (id INTEGER PRIMARY KEY, video_id INTEGER, '
+                                           'metadata_id INTEGER, "OS_filepath" VARCHAR, frame_index INTEGER)'))
+        connection.execute(sqlalchemy.text('INSERT INTO videos (id, frame_count) VALUES (1, 5)'))
+
+    Base.metadata.create_all(old_engine)
+    upgrade_schema(old_engine)
+    upgrade_schema(old_engine)
+
+    inspector = sqlalchemy.inspect(old_engine)
+    assert {column.name for column in Frame.__table__.columns} <= \
+        {column['name'] for column in inspector.get_columns('frames')}
+    assert {column.name for column in Video.__table__.columns} <= \
+        {column['name'] for column in inspector.get_columns('videos')}
+    assert 'ix_frames_video_id_frame_index' in {index['name'] for index in inspector.get_indexes('frames')}
+
+    with Session(old_engine) as session:
+        assert session.get(Video, 1).frame_count == 5
+
+
+def test_videos_being_ingested_are_not_cached():
+    with db_service.Session() as session:
+        video_instance = Video(observation_post_name='test', OS_filepath='/videos/test_video.mp4')
+        session.add(video_instance)
+        session.commit()
+
+    assert db_service.get_video_by_id(video_instance.id).frame_count is None
+
+    # The ingest finishing in another server process, which can't invalidate this process' cache
+    with Session(engine) as session:
+        session.get(Video, video_instance.id).frame_count = 20
+        session.commit()
+
+    assert db_service.get_video_by_id(video_instance.id).frame_count == 20
+
+
+def test_read_cache_eviction_and_ttl():
+    cache = LRUCache(max_size=3, ttl_seconds=0.05, size_of=lambda value: len(value))
+    cache.set('a', [1])
+    cache.set('b', [1, 2])
+    assert cache.get('a') == [1]
+
+    cache.set('c', [1])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+
+    time.sleep(0.1)
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 2
+
+
+def test_read_cache_drops_loads_that_raced_an_invalidation():
+    cache = LRUCache()
+
+    def load_before_update():
+        # The row is read, then an update commits and invalidates before the load returns
+        cache.invalidate('video')
+
+        return 'stale'
+
+    assert cache.get_or_load('video', load_before_update) == 'stale'
+    assert cache.get('video') is None
+
+    assert cache.get_or_load('video', lambda: 'fresh') == 'fresh'
+    assert cache.get('video') == 'fresh'
+
+
+def test_threat_cascade_matches_is_frame_tagged(test_video_path):
+    video = cv2.VideoCapture(test_video_path)
+    cascade = ThreatCascade()
+    frame_count = 0
+    tagged_frame_count = 0
+
+    try:
+        while True:
+            ret, frame = video.read()
+
+            if not ret:
+                break
+
+            is_tagged = is_frame_tagged(frame)
+            assert cascade.is_frame_tagged(frame) == is_tagged, f'Decisions differ on frame {frame_count}'
+            frame_count += 1
+            tagged_frame_count += is_tagged
+    finally:
+        video.release()
+
+    assert frame_count == 466
+    assert 0 < tagged_frame_count < frame_count
+
+
+def test_threat_cascade_matches_is_frame_tagged_on_varied_skulls():
+    random_generator = np.random.default_rng(0)
+    skull_image = np.array(Image.open(BytesIO(base64.b64decode(SKULL_IMAGE_BASE64))).convert('RGB'))
+    tagged_frame_count = 0
+
+    for frame_number in range(60):
+        frame = random_generator.integers(0, 256, (360, 480, 3), dtype=np.uint8)
+
+        if frame_number % 2 == 0:
+            scale = random_generator.uniform(0.85, 1.15)
+            skull = cv2.resize(skull_image, None, fx=scale, fy=scale)
+            top = random_generator.integers(0, frame.shape[0] - skull.shape[0])
+            left = random_generator.integers(0, frame.shape[1] - skull.shape[1])
+            alpha = random_generator.uniform(0.4, 1)
+            region = frame[top:top + skull.shape[0], left:left + skull.shape[1]]
+            region[...] = (alpha * skull + (1 - alpha) * region).astype(np.uint8)
+
+        # A new cascade per frame, the random frames must not reuse each other's decisions
+        is_tagged = is_frame_tagged(frame)
+        assert ThreatCascade().is_frame_tagged(frame) == is_tagged, f'Decisions differ on frame {frame_number}'
+        tagged_frame_count += is_tagged
+
+    assert tagged_frame_count > 0
+
+
+def test_metrics_render_in_the_prometheus_format():
+    metrics_registry = MetricsRegistry()
+    requests = metrics_registry.counter('test_requests_total', 'Requests', ('endpoint',))
+    latency = metrics_registry.histogram('test_latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1))
+    metrics_registry.register(CallbackMetric('test_cache_entries', 'Cache entries', 'gauge', lambda: 7))
+
+    requests.inc(endpoint='/videos')
+    requests.inc(2, endpoint='/videos')
+    requests.inc(endpoint='say "hi"\n')
+
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, endpoint='/videos')
+
+    assert metrics_registry.render().splitlines() == [
+        '# HELP test_requests_total Requests',
+        '# TYPE test_requests_total counter',
+        'test_requests_total{endpoint="/videos"} 3.0',
+        'test_requests_total{endpoint="say \\"hi\\"\\n"} 1.0',
+        '# HELP test_latency_seconds Latency',
+        '# TYPE test_latency_seconds histogram',
+        # Buckets are cumulative, an upper bound is inclusive
+        'test_latency_seconds_bucket{endpoint="/videos",le="0.1"} 2',
+        'test_latency_seconds_bucket{endpoint="/videos",le="1.0"} 3',
+        'test_latency_seconds_bucket{endpoint="/videos",le="+Inf"} 4',
+        'test_latency_seconds_sum{endpoint="/videos"} 3.65',
+        'test_latency_seconds_count{endpoint="/videos"} 4',
+        '# HELP test_cache_entries Cache entries',
+        '# TYPE test_cache_entries gauge',
+        'test_cache_entries 7.0',
+    ]
+
+
+def test_metrics_endpoint(client):
+    client.get('/videos')
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'videodb_http_requests_total{endpoint="/videos",status="200"}' in response.get_data(as_text=True)
+    assert '# TYPE videodb_db_query_seconds histogram' in response.get_data(as_text=True)
+
+
+def test_cascade_decisions_are_not_reused_across_batches(monkeypatch):
+    cascade = ThreatCascade()
+    monkeypatch.setattr('threat_detection._process_cascade', cascade)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+
+    # The last frame of a batch of another video, identical to the next one but tagged
+    assert not cascade.is_frame_tagged(frame)
+    cascade._previous_decision = True
+
+    frames_memory = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+
+    try:
+        frames_memory.buf[:frame.nbytes] = frame.tobytes()
+        assert _detect_shared_batch(frames_memory.name, [(0, frame.shape, frame.dtype.str)], 'cascade') == [False]
+    finally:
+        frames_memory.close()
+        frames_memory.unlink()
+
+
+def test_threat_detector_recovers_from_a_dead_process():
+    threat_detector = ThreatDetector(workers=1)
+    frames = [np.zeros((240, 320, 3), dtype=np.uint8)]
+
+    try:
+        assert threat_detector.detect_batch(frames) == [False]
+
+        # The worker process dying, like the OOM killer would kill it
+        with pytest.raises(BrokenProcessPool):
+            threat_detector._get_executor().submit(os._exit, 1).result()
+
+        with pytest.raises(BrokenProcessPool):
+            threat_detector.detect_batch(frames)
+
+        assert threat_detector.detect_batch(frames) == [False]
+    finally:
+        threat_detector.shutdown()
+
+
+def test_failed_profiled_request_releases_the_profiler(client, monkeypatch, tmp_path):
+    def failing_view():
+        raise RuntimeError('View failed')
+
+    monkeypatch.setattr('app.profile_on_header', True)
+    monkeypatch.setattr('app.profile_dir', str(tmp_path))
+    monkeypatch.setitem(app.view_functions, 'get_metrics', failing_view)
+    # Like debug mode, the exception propagates and after_request never runs
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', True)
+
+    with pytest.raises(RuntimeError):
+        client.get('/metrics', headers={'X-Profile': '1'})
+
+    assert not profiler_lock.locked()
+    assert 'videodb_http_requests_total{endpoint="/metrics",status="500"} 1.0' in registry.render()
@@ -0,0 +1,214 @@
+import os
+import cv2
+import logging
+import threading
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from sampling import frame_signature
+from given_functions import is_frame_tagged, load_skull_template, TAG_CONFIDENCE
+
+EXACT_DETECTION = 'exact'
+CASCADE_DETECTION = 'cascade'
+DETECTION_WORKERS = int(os.getenv('DETECTION_WORKERS', os.cpu_count() or 1))
+DETECTION_MODE = os.getenv('DETECTION_MODE', EXACT_DETECTION)
+# Locations scoring at least this on the low resolution screen are verified at full (matching) resolution
+CASCADE_SCREEN_CONFIDENCE = float(os.getenv('CASCADE_SCREEN_CONFIDENCE', 0.35))
+# With more candidate locations than this, a single match over the whole frame is cheaper than one per location
+CASCADE_MAX_CANDIDATES = int(os.getenv('CASCADE_MAX_CANDIDATES', 64))
+# A frame whose signature differs from the previous frame by less than this in every cell reuses its decision
+CASCADE_REUSE_DIFFERENCE = float(os.getenv('CASCADE_REUSE_DIFFERENCE', 2))
+
+_process_cascade = None
+
+
+class ThreatCascade:
+    """
+    A cheaper equivalent of is_frame_tagged for video.
+
+    The frame is first screened at a quarter of the matching resolution, and the full match runs only around the
+    locations that scored at least screen_confidence, stopping at the first one above the tagging confidence.
+    A frame that is nearly identical to the previous one reuses its decision without matching at all.
+    The cascade keeps the previous frame as state, so every process or thread needs its own instance, and it must be
+    reset before frames that don't follow the previous ones (e.g. a batch of another video).
+    """
+
+    def __init__(self, screen_confidence=CASCADE_SCREEN_CONFIDENCE, max_candidates=CASCADE_MAX_CANDIDATES,
+                 reuse_difference=CASCADE_REUSE_DIFFERENCE):
+        self.screen_confidence = screen_confidence
+        self.max_candidates = max_candidates
+        self.reuse_difference = reuse_difference
+        self.template = load_skull_template()
+        self.coarse_template = np.ascontiguousarray(self.template[::2, ::2])
+        self._previous_signature = None
+        self._previous_decision = None
+
+    def reset(self):
+        self._previous_signature = None
+        self._previous_decision = None
+
+    def is_frame_tagged(self, frame):
+        signature = frame_signature(frame)
+
+        if self._previous_signature is not None and \
+                np.abs(signature - self._previous_signature).max() < self.reuse_difference:
+            return self._previous_decision
+
+        decision = self._match(np.ascontiguousarray(frame[::2, ::2]))
+        self._previous_signature = signature
+        self._previous_decision = decision
+
+        return decision
+
+    def _match(self, frame):
+        template_height, template_width = self.template.shape[:2]
+        coarse_result = cv2.matchTemplate(np.ascontiguousarray(frame[::2, ::2]), self.coarse_template,
+                                          cv2.TM_CCOEFF_NORMED)
+        candidate_ys, candidate_xs = np.nonzero(coarse_result >= self.screen_confidence)
+
+        if len(candidate_ys) == 0:
+            return False
+
+        if len(candidate_ys) > self.max_candidates:
+            return bool((cv2.matchTemplate(frame, self.template, cv2.TM_CCOEFF_NORMED) > TAG_CONFIDENCE).any())
+
+        # Best candidates first, so a tagged frame usually exits on the first window
+        order = np.argsort(-coarse_result[candidate_ys, candidate_xs])
+        # A coarse location stands for a 2x2 block of matching locations, verify them with a margin for the rounding
+        margin = 3
+        verified_windows = []
+
+        for candidate_index in order:
+            center_y, center_x = candidate_ys[candidate_index] * 2, candidate_xs[candidate_index] * 2
+
+            if any(top <= center_y < bottom and left <= center_x < right
+                   for top, bottom, left, right in verified_windows):
+                continue
+
+            top, left = max(center_y - margin, 0), max(center_x - margin, 0)
+            bottom = min(center_y + margin + 1, frame.shape[0] - template_height + 1)
+            right = min(center_x + margin + 1, frame.shape[1] - template_width + 1)
+            verified_windows.append((top, bottom, left, right))
+            window = frame[top:bottom + template_height - 1, left:right + template_width - 1]
+
+            if (cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED) > TAG_CONFIDENCE).any():
+                return True
+
+        return False
+
+
+def _init_detection_worker():
+    # Decoding the template is the expensive part of is_frame_tagged, do it once when the process starts
+    load_skull_template()
+
+
+def _detect_shared_batch(shared_memory_name, frame_layouts, detection_mode):
+    global _process_cascade
+
+    frames_memory = shared_memory.SharedMemory(name=shared_memory_name)
+
+    if detection_mode == CASCADE_DETECTION:
+        if _process_cascade is None:
+            _process_cascade = ThreatCascade()
+
+        # A process gets batches of every detection thread and job, only the frames of a batch follow each other
+        _process_cascade.reset()
+
+    detect = _process_cascade.is_frame_tagged if detection_mode == CASCADE_DETECTION else is_frame_tagged
+
+    try:
+        results = []
+
+        for offset, shape, dtype in frame_layouts:
+            frame = np.ndarray(shape, dtype=dtype, buffer=frames_memory.buf, offset=offset)
+            results.append(detect(frame))
+            del frame
+
+        return results
+    finally:
+        frames_memory.close()
+
+
+class ThreatDetector:
+    """
+    Runs is_frame_tagged on a pool of processes, so template matching scales with the number of cores.
+
+    Frames are handed to the workers through shared memory instead of being pickled.
+    detection_mode is "exact" for is_frame_tagged itself or "cascade" for a ThreatCascade per process.
+    A pool that lost a process (e.g. killed out of memory) fails the batches it was running and is replaced by a new one
+    on the next batch.
+    """
+
+    def __init__(self, workers=DETECTION_WORKERS, detection_mode=DETECTION_MODE):
+        self.workers = workers
+        self.detection_mode = detection_mode
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                logging.info(f'Starting threat detection engine with {self.workers} processes')
+                # Forking a process that runs server and DB threads is unsafe, start clean interpreters instead
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_detection_worker)
+
+        return self._executor
+
+    def _discard_executor(self, executor):
+        with self._executor_lock:
+            # Another batch may have replaced the broken pool already
+            if self._executor is executor:
+                self._executor = None
+
+        executor.shutdown(wait=False)
+
+    def detect_batch(self, frames):
+        """
+        Check a batch of frames for threats.
+
+        :param frames: A list of frames (numpy arrays).
+        :return: A list of booleans, True for every frame that is tagged.
+        """
+
+        if not frames:
+            return []
+
+        total_size = sum(frame.nbytes for frame in frames)
+        frames_memory = shared_memory.SharedMemory(create=True, size=total_size)
+
+        try:
+            frame_layouts = []
+            offset = 0
+
+            for frame in frames:
+                shared_frame = np.ndarray(frame.shape, dtype=frame.dtype, buffer=frames_memory.buf, offset=offset)
+                shared_frame[...] = frame
+                del shared_frame
+                frame_layouts.append((offset, frame.shape, frame.dtype.str))
+                offset += frame.nbytes
+
+            executor = self._get_executor()
+
+            try:
+                return executor.submit(_detect_shared_batch, frames_memory.name, frame_layouts,
+                                       self.detection_mode).result()
+            except BrokenProcessPool:
+                logging.error('A threat detection process died, restarting the threat detection engine')
+                self._discard_executor(executor)
+                raise
+        finally:
+            frames_memory.close()
+            frames_memory.unlink()
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+threat_detector = ThreatDetector()
@@ -0,0 +1,83 @@
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+ZIP_PREFETCH_WORKERS = int(os.getenv('ZIP_PREFETCH_WORKERS', 8))
+ZIP_PREFETCH_DEPTH = int(os.getenv('ZIP_PREFETCH_DEPTH', 16))
+
+
+class _ChunkSink:
+    # A write-only, unseekable file, zipfile then writes data descriptors instead of seeking back to the headers
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop_chunks(self):
+        chunks = self.chunks
+        self.chunks = []
+
+        return chunks
+
+
+def prefetch(items, fetch, workers=ZIP_PREFETCH_WORKERS, depth=ZIP_PREFETCH_DEPTH):
+    """
+    Fetch items concurrently while keeping their order.
+
+    :param items: The items to fetch.
+    :param fetch: Called with an item, returns its content.
+    :param workers: The number of concurrent fetches.
+    :param depth: The number of fetched items that may wait for the consumer, this bounds the memory used.
+    :return: A generator of (item, content) tuples, in the order of items.
+    """
+
+    items = iter(items)
+    pending = deque()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                pending.append((item, executor.submit(fetch, item)))
+
+                if len(pending) >= depth:
+                    break
+
+            while pending:
+                item, future = pending.popleft()
+                content = future.result()
+                next_item = next(items, None)
+
+                if next_item is not None:
+                    pending.append((next_item, executor.submit(fetch, next_item)))
+
+                yield item, content
+        finally:
+            # The consumer may stop early (e.g. the client disconnected), don't fetch what nobody will read
+            for _, future in pending:
+                future.cancel()
+
+
+def stream_stored_zip(entries):
+    """
+    Build a ZIP archive on the fly, without compression.
+
+    :param entries: An iterable of (file name, content bytes) tuples.
+    :return: A generator of the archive's byte chunks.
+    """
+
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as zf:
+        for file_name, content in entries:
+            zf.writestr(file_name, content)
+
+            yield b''.join(sink.pop_chunks())
+
+    yield b''.join(sink.pop_chunks())